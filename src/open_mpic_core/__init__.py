@@ -38,6 +38,8 @@ from open_mpic_core.common_domain.check_response_details import (
 from open_mpic_core.common_domain.check_response import CheckResponse, CaaCheckResponse, DcvCheckResponse
 
 from open_mpic_core.common_util.domain_encoder import DomainEncoder
+from open_mpic_core.common_util.inflight_lookups import InflightLookups
+from open_mpic_core.common_util.domain_tree_walker import DomainTreeWalker
 from open_mpic_core.common_util.trace_level_logger import get_logger
 from open_mpic_core.common_util.trace_level_logger import TRACE_LEVEL
 
@@ -49,6 +51,7 @@ from open_mpic_core.mpic_coordinator.domain.mpic_orchestration_parameters import
 
 from open_mpic_core.mpic_coordinator.domain.perspective_response import PerspectiveResponse
 from open_mpic_core.mpic_coordinator.domain.mpic_request import MpicRequest, MpicDcvRequest, MpicCaaRequest
+from open_mpic_core.mpic_coordinator.domain.mpic_request import MPIC_REQUEST_ADAPTER
 from open_mpic_core.mpic_coordinator.domain.mpic_response import MpicResponse, MpicCaaResponse, MpicDcvResponse
 from open_mpic_core.mpic_coordinator.domain.mpic_request_errors import (
     MpicRequestValidationException,
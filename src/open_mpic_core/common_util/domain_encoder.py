@@ -1,3 +1,4 @@
+import functools
 import ipaddress
 
 import dns.name
@@ -7,6 +8,8 @@ from dns.name import IDNAException
 
 class DomainEncoder:
     @staticmethod
+    # targets recur across checks (perspectives, retries); idna encoding is not cheap
+    @functools.lru_cache(maxsize=4096)
     def prepare_target_for_lookup(domain_or_ip_target) -> str:
         # Handle bracketed IPv6 addresses (e.g., [2606:4700:4700::1111])
         if domain_or_ip_target.startswith("[") and domain_or_ip_target.endswith("]"):
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+import dns.name
+import dns.resolver
+from dns.name import Name
+
+T = TypeVar("T")
+
+
+class DomainTreeWalker:
+    @staticmethod
+    async def walk_speculatively(domain: Name, resolve: Callable[[Name], Awaitable[T]]) -> tuple[T | None, Name]:
+        """
+        Finds the most specific of domain and its ancestors (root excluded) for which resolve() gets an answer, same
+        as resolving one label at a time would, but with all ancestors queried at once once the domain itself has no
+        answer. resolve() raising NXDOMAIN or NoAnswer moves on to the parent; any other error is raised as is.
+
+        Nothing here limits how many ancestor queries are in flight: resolve() is expected to bound its own queries
+        (e.g., by holding the checker's DNS query semaphore), so that walks count against the same limit as any
+        other query.
+
+        :return: the answer and the name it was found at, or (None, root) if there was none.
+        """
+        # the target itself is the common hit, so look it up alone first
+        if domain != dns.name.root:
+            try:
+                return await resolve(domain), domain
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                domain = domain.parent()
+
+        ancestors = []
+        while domain != dns.name.root:
+            ancestors.append(domain)
+            domain = domain.parent()
+        lookup_tasks = [asyncio.ensure_future(resolve(ancestor)) for ancestor in ancestors]
+        try:
+            # take the answers from most to least specific; once one is decisive, the less specific ones aren't needed
+            for ancestor, lookup_task in zip(ancestors, lookup_tasks):
+                try:
+                    return await lookup_task, ancestor
+                except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                    continue
+            return None, dns.name.root
+        finally:
+            for lookup_task in lookup_tasks:
+                lookup_task.cancel()
+            await asyncio.gather(*lookup_tasks, return_exceptions=True)  # let them wind down; outcomes are discarded
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _InflightLookup:
+    __slots__ = ("task", "awaiter_count")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.awaiter_count = 0
+
+
+class InflightLookups:
+    """
+    Runs concurrent identical lookups (same key) only once, sharing the outcome with every caller that asks while the
+    lookup is under way. The lookup runs in a task of its own that no single caller owns: a caller that is cancelled
+    (e.g., on timing out) just stops waiting, and the lookup itself is cancelled only once nobody is left waiting for it.
+    """
+
+    def __init__(self):
+        self._lookups: dict[Hashable, _InflightLookup] = {}
+
+    def __len__(self) -> int:
+        return len(self._lookups)
+
+    async def run(self, key: Hashable, lookup: Callable[[], Awaitable[T]]) -> T:
+        inflight_lookup = self._lookups.get(key)
+        if inflight_lookup is None:
+            inflight_lookup = _InflightLookup(asyncio.ensure_future(lookup()))
+            self._lookups[key] = inflight_lookup
+            inflight_lookup.task.add_done_callback(lambda task: self._forget(key, inflight_lookup))
+
+        inflight_lookup.awaiter_count += 1
+        try:
+            # shield so that cancelling this caller doesn't cancel the lookup for everyone else awaiting it
+            return await asyncio.shield(inflight_lookup.task)
+        finally:
+            inflight_lookup.awaiter_count -= 1
+            if inflight_lookup.awaiter_count == 0 and not inflight_lookup.task.done():
+                inflight_lookup.task.cancel()  # only reachable once the last caller has been cancelled
+
+    def _forget(self, key: Hashable, inflight_lookup: _InflightLookup) -> None:
+        if self._lookups.get(key) is inflight_lookup:
+            del self._lookups[key]
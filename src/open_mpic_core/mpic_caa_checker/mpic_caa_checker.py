@@ -1,6 +1,8 @@
+import asyncio
 import re
 import time
-from typing import Final, Optional
+from collections import OrderedDict
+from typing import Collection, Final, Optional
 import dns.resolver
 import dns.asyncresolver
 from dns.name import Name
@@ -8,7 +10,7 @@ from dns.rrset import RRset
 
 from open_mpic_core import CaaCheckRequest, CaaCheckResponse, CaaCheckResponseDetails
 from open_mpic_core import MpicValidationError, ErrorMessages
-from open_mpic_core import DomainEncoder
+from open_mpic_core import DomainEncoder, DomainTreeWalker, InflightLookups
 from open_mpic_core import get_logger
 from open_mpic_core import CertificateType
 
@@ -19,6 +21,20 @@ IODEF_TAG: Final[str] = "iodef"
 # to accommodate email and phone based DCV that gets contact info from CAA records
 CONTACTEMAIL_TAG: Final[str] = "contactemail"
 CONTACTPHONE_TAG: Final[str] = "contactphone"
+# non-issuance tags that are known to us, so a critical flag on them does not block issuance
+KNOWN_NON_ISSUANCE_TAGS: Final[frozenset[str]] = frozenset({CONTACTEMAIL_TAG, CONTACTPHONE_TAG, IODEF_TAG})
+# raw forms of the above, to match against CAA rdata tags (ASCII bytes) without decoding them
+ISSUE_TAG_BYTES: Final[bytes] = ISSUE_TAG.encode("ascii")
+ISSUEWILD_TAG_BYTES: Final[bytes] = ISSUEWILD_TAG.encode("ascii")
+ISSUEMAIL_TAG_BYTES: Final[bytes] = ISSUEMAIL_TAG.encode("ascii")
+KNOWN_NON_ISSUANCE_TAGS_BYTES: Final[frozenset[bytes]] = frozenset(
+    tag.encode("ascii") for tag in KNOWN_NON_ISSUANCE_TAGS
+)
+
+# CAA parameter tags and issuer domain labels share a grammar: (ALPHA / DIGIT) *( *("-") (ALPHA / DIGIT))
+CAA_TAG_OR_LABEL_REGEX: Final[re.Pattern] = re.compile(r"^[a-zA-Z0-9]+(?:-*[a-zA-Z0-9]+)*$")
+# CAA parameter values permit only %x21-3A / %x3C-7E (visible ASCII other than ";")
+CAA_PARAMETER_VALUE_ALLOWED_BYTES: Final[bytes] = bytes(range(0x21, 0x7F)).replace(b";", b"")
 
 logger = get_logger(__name__)
 
@@ -34,46 +50,135 @@ class MpicCaaChecker:
         log_level: int = None,
         dns_timeout: float = None,
         dns_resolution_lifetime: float = None,
+        caa_cache_size: int = 0,
+        dns_cache_size: int = 0,
+        max_concurrent_dns_queries: int = 64,
+        speculative_parent_lookups: bool = False,
     ):
+        """
+        :param caa_cache_size: max number of CAA lookup results to keep in memory (0 disables caching). Cached
+               results are only ever served while within the TTL of the CAA RRset that was found.
+        :param dns_cache_size: max number of DNS answers (including NXDOMAIN and no answer, as seen while walking the
+               domain tree) for the checker's resolver to cache within their TTL (0 disables caching). Off by default
+               so that a retried check always sees record changes.
+        :param max_concurrent_dns_queries: max number of CAA queries this checker will have in flight at once, to
+               stay within the query rate the upstream resolver will tolerate.
+        :param speculative_parent_lookups: if True and the target itself has no CAA records, query all of its
+               ancestors at once rather than one label at a time. Cuts latency for deep names at the cost of a few
+               extra queries; the result is the same either way.
+        """
         self.default_caa_domain_list = default_caa_domain_list
+        # CAA issuer domain names are matched case-insensitively, so keep a lowercased set for membership tests
+        self._default_caa_domains = frozenset(caa_domain.lower() for caa_domain in default_caa_domain_list)
 
         self.logger = logger.getChild(self.__class__.__name__)
         if log_level is not None:
             self.logger.setLevel(log_level)
 
-        self.resolver = dns.asyncresolver.get_default_resolver()
+        # a dedicated resolver per checker: avoids mutating the process-wide default resolver's settings,
+        # and lets repeated lookups reuse its parsed resolver config (and answer cache, if enabled)
+        self.resolver = dns.asyncresolver.Resolver()
+        if dns_cache_size > 0:
+            self.resolver.cache = dns.resolver.LRUCache(dns_cache_size)
         self.resolver.timeout = dns_timeout if dns_timeout is not None else self.resolver.timeout
         self.resolver.lifetime = (
             dns_resolution_lifetime if dns_resolution_lifetime is not None else self.resolver.lifetime
         )
+        self._max_concurrent_dns_queries = max_concurrent_dns_queries
+        # asyncio primitives bind to the loop they're first contended on, so keep one per loop (see below)
+        self._dns_query_semaphore = None
+        self._dns_query_semaphore_loop = None
+        self.speculative_parent_lookups = speculative_parent_lookups
+
+        self.caa_cache_size = caa_cache_size
+        # target -> (rrset, domain where found, expiry per time.monotonic()); ordered by recency of use
+        self._caa_cache: OrderedDict[str, tuple[RRset, Name, float]] = OrderedDict()
+        # lookups currently under way by target, so that concurrent identical lookups share a single DNS answer
+        self._inflight_caa_lookups = InflightLookups()
 
     async def find_caa_records_and_domain(self, caa_request) -> tuple[RRset, Name]:
+        target = caa_request.domain_or_ip_target
+        cached_result = self._get_cached_caa_lookup(target)
+        if cached_result is not None:
+            return cached_result
+
+        return await self._inflight_caa_lookups.run(target, lambda: self._look_up_caa_records_and_domain(target))
+
+    async def _look_up_caa_records_and_domain(self, target: str) -> tuple[RRset, Name]:
+        rrset, domain = await self._walk_domain_tree_for_caa_records(target)
+        if rrset is not None:
+            self._cache_caa_lookup(target, rrset, domain)
+        return rrset, domain
+
+    async def _walk_domain_tree_for_caa_records(self, target: str) -> tuple[RRset, Name]:
         rrset = None
-        domain = dns.name.from_text(caa_request.domain_or_ip_target)
+        domain = dns.name.from_text(target)
+
+        if self.speculative_parent_lookups:
+            return await self._walk_domain_tree_for_caa_records_speculatively(domain)
 
         while domain != dns.name.root:
             try:
-                lookup = await self.resolver.resolve(domain, dns.rdatatype.CAA)
+                lookup = await self._resolve_caa(domain)
                 rrset = lookup.rrset
                 break
             except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
                 domain = domain.parent()
             # will raise other exceptions that we want to catch in the calling function
+        return rrset, domain
 
+    async def _walk_domain_tree_for_caa_records_speculatively(self, domain: Name) -> tuple[RRset, Name]:
+        lookup, domain = await DomainTreeWalker.walk_speculatively(domain, self._resolve_caa)
+        return (lookup.rrset if lookup is not None else None), domain
+
+    async def _resolve_caa(self, domain: Name):
+        async with self.get_dns_query_semaphore():
+            return await self.resolver.resolve(domain, dns.rdatatype.CAA)
+
+    def get_dns_query_semaphore(self) -> asyncio.Semaphore:
+        """
+        Returns the semaphore bounding the DNS queries in flight on the current event loop, creating it when first
+        needed (or when the loop has changed since, e.g. across separate asyncio.run() calls).
+        """
+        current_loop = asyncio.get_running_loop()
+        if self._dns_query_semaphore is None or self._dns_query_semaphore_loop is not current_loop:
+            self._dns_query_semaphore = asyncio.Semaphore(self._max_concurrent_dns_queries)
+            self._dns_query_semaphore_loop = current_loop
+        return self._dns_query_semaphore
+
+    def _get_cached_caa_lookup(self, target: str) -> tuple[RRset, Name] | None:
+        cache_entry = self._caa_cache.get(target)
+        if cache_entry is None:
+            return None
+        rrset, domain, expiry = cache_entry
+        if time.monotonic() >= expiry:
+            del self._caa_cache[target]  # evict lazily once the TTL has run out
+            return None
+        self._caa_cache.move_to_end(target)
         return rrset, domain
 
+    def _cache_caa_lookup(self, target: str, rrset: RRset, domain: Name) -> None:
+        if self.caa_cache_size <= 0 or rrset.ttl <= 0:
+            return
+        self._caa_cache[target] = (rrset, domain, time.monotonic() + rrset.ttl)
+        self._caa_cache.move_to_end(target)
+        while len(self._caa_cache) > self.caa_cache_size:
+            self._caa_cache.popitem(last=False)  # evict least recently used
+
     async def check_caa(self, caa_request: CaaCheckRequest) -> CaaCheckResponse:
         # noinspection PyUnresolvedReferences
         self.logger.trace(f"Checking CAA for {caa_request.domain_or_ip_target}")
 
         # Assume the default system configured validation targets and override if sent in the API call.
-        caa_domains = self.default_caa_domain_list
+        caa_domains = self._default_caa_domains
         is_wc_domain = False
         certificate_type = CertificateType.TLS_SERVER
         if caa_request.caa_check_parameters:
             certificate_type = caa_request.caa_check_parameters.certificate_type  # defaults to TLS_SERVER
             if caa_request.caa_check_parameters.caa_domains:
-                caa_domains = caa_request.caa_check_parameters.caa_domains
+                caa_domains = frozenset(
+                    caa_domain.lower() for caa_domain in caa_request.caa_check_parameters.caa_domains
+                )
 
         # Use the domain name to determine if it is a wildcard domain
         # check if domain or ip target has an asterisk as its lowest (first) label (e.g. *.example.com)
@@ -144,28 +249,23 @@ class MpicCaaChecker:
         issue_tag_values = []
         issuewild_tag_values = []
         issuemail_tag_values = []
-        has_unknown_critical_flags = False
 
         # Note: a record with critical flag and 'issue' tag will be considered valid for issuance
         for resource_record in rrset:
-            tag = resource_record.tag.decode("utf-8")
-            tag_lower = tag.lower()
-            val = resource_record.value.decode("utf-8")
-            if tag_lower == ISSUE_TAG:
-                issue_tag_values.append(val)
-            elif tag_lower == ISSUEWILD_TAG:
-                issuewild_tag_values.append(val)
-            elif tag_lower == ISSUEMAIL_TAG:
-                issuemail_tag_values.append(val)
+            tag_lower = resource_record.tag.lower()  # bytes.lower() only folds ASCII, which is all a tag may hold
+            if tag_lower == ISSUE_TAG_BYTES:
+                issue_tag_values.append(resource_record.value.decode("utf-8"))
+            elif tag_lower == ISSUEWILD_TAG_BYTES:
+                issuewild_tag_values.append(resource_record.value.decode("utf-8"))
+            elif tag_lower == ISSUEMAIL_TAG_BYTES:
+                issuemail_tag_values.append(resource_record.value.decode("utf-8"))
             elif (
-                not (tag_lower in [CONTACTEMAIL_TAG, CONTACTPHONE_TAG, IODEF_TAG])
-                and resource_record.flags & 0b10000000
+                tag_lower not in KNOWN_NON_ISSUANCE_TAGS_BYTES and resource_record.flags & 0b10000000
             ):  # bitwise-and to check if flags are 128 (the critical flag)
-                has_unknown_critical_flags = True
+                # an unknown critical tag forbids issuance no matter what else the RRset holds; no need to look further
+                return False
 
-        if has_unknown_critical_flags:
-            valid_for_issuance = False
-        elif certificate_type == CertificateType.S_MIME:
+        if certificate_type == CertificateType.S_MIME:
             if len(issuemail_tag_values) > 0:
                 valid_for_issuance = MpicCaaChecker.do_caa_values_permit_issuance(issuemail_tag_values, caa_domains)
             else:
@@ -185,7 +285,10 @@ class MpicCaaChecker:
         return valid_for_issuance
 
     @staticmethod
-    def do_caa_values_permit_issuance(value_list: list, caa_domains):
+    def do_caa_values_permit_issuance(value_list: list, caa_domains: Collection[str]):
+        """
+        :param caa_domains: lowercased CAA issuer domain names to match against; pass a set for fast membership tests
+        """
         issuance_permitted = False
         for value in value_list:
             try:
@@ -220,14 +323,13 @@ class MpicCaaChecker:
                     value = tag_and_value[1].strip()
 
                     # validate tag format (tag = (ALPHA / DIGIT) *( *("-") (ALPHA / DIGIT)))
-                    tagged_match_regex = r"^[a-zA-Z0-9]+(-*[a-zA-Z0-9]+)*$"
-                    if not re.match(tagged_match_regex, tag):
+                    if not CAA_TAG_OR_LABEL_REGEX.match(tag):
                         raise ValueError(f"CAA tag contains disallowed character: {tag!r}")
 
-                    # validate value format (value = *(%x21-3A / %x3C-7E))
-                    for character in value:
-                        if not (0x21 <= ord(character) <= 0x7E and character != ";"):
-                            raise ValueError(f"CAA value contains disallowed character: {value!r}")
+                    # validate value format (value = *(%x21-3A / %x3C-7E)); anything left after deleting the
+                    # allowed bytes is disallowed
+                    if not value.isascii() or value.encode("ascii").translate(None, CAA_PARAMETER_VALUE_ALLOWED_BYTES):
+                        raise ValueError(f"CAA value contains disallowed character: {value!r}")
 
                     parameters[tag] = value
         else:
@@ -237,8 +339,7 @@ class MpicCaaChecker:
             domain_labels = issuer_domain_name.split(".")
 
             # validate label format (label = (ALPHA / DIGIT) *( *("-") (ALPHA / DIGIT)))
-            domain_label_match_regex = r"^[a-zA-Z0-9]+(-*[a-zA-Z0-9]+)*$"
-            is_valid = all(re.match(domain_label_match_regex, label) for label in domain_labels)
+            is_valid = all(CAA_TAG_OR_LABEL_REGEX.match(label) for label in domain_labels)
 
             if not is_valid:
                 raise ValueError(f"CAA issuer domain name is not a valid domain name: {issuer_domain_name!r}")
@@ -1,6 +1,6 @@
 from abc import ABC
-from typing import Literal, Union
-from pydantic import BaseModel
+from typing import Annotated, Literal, Union
+from pydantic import BaseModel, Field, TypeAdapter
 
 from open_mpic_core import CheckType
 
@@ -25,3 +25,6 @@ class MpicDcvRequest(BaseMpicRequest):
 
 
 MpicRequest = Union[MpicCaaRequest, MpicDcvRequest]
+
+# Built once and shared: deserializes a request of either type, picking the model straight from check_type.
+MPIC_REQUEST_ADAPTER = TypeAdapter(Annotated[MpicRequest, Field(discriminator="check_type")])
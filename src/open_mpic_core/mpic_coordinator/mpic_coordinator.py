@@ -1,5 +1,7 @@
 import asyncio
 import json
+from collections import OrderedDict
+from contextlib import nullcontext
 from itertools import cycle
 
 from pprint import pformat
@@ -22,6 +24,7 @@ from open_mpic_core import MpicRequestValidationMessages
 from open_mpic_core import MpicRequestValidator
 from open_mpic_core import MpicResponseBuilder
 from open_mpic_core import get_logger
+from open_mpic_core import TRACE_LEVEL
 
 logger = get_logger(__name__)
 
@@ -40,6 +43,8 @@ class MpicCoordinator:
         call_remote_perspective_function,
         mpic_coordinator_configuration: MpicCoordinatorConfiguration,
         log_level: int = None,
+        cohort_cache_size: int = 4096,
+        return_early_on_quorum: bool = False,
     ):
         """
         :param call_remote_perspective_function: a "dumb" transport for serialized data to a remote perspective and
@@ -48,6 +53,11 @@ class MpicCoordinator:
                may raise an exception if something goes wrong.
         :param mpic_coordinator_configuration: environment-specific configuration for the coordinator.
         :param log_level: optional parameter for logging. For now really just used for TRACE logging.
+        :param cohort_cache_size: max number of cohort groupings to remember (0 disables caching). Cohorts are a
+               deterministic function of the target, cohort size, available perspectives and hash secret.
+        :param return_early_on_quorum: if True, stop waiting on remote perspectives as soon as the responses received
+               so far make the attempt valid. Perspectives that were cut off are reported with a remote check error.
+               Off by default, as the response then no longer holds every perspective's actual result.
         """
         self.target_perspectives = mpic_coordinator_configuration.target_perspectives
         self.default_perspective_count = mpic_coordinator_configuration.default_perspective_count
@@ -55,6 +65,11 @@ class MpicCoordinator:
         self.hash_secret = mpic_coordinator_configuration.hash_secret
         self.call_remote_perspective_function = call_remote_perspective_function
 
+        self.return_early_on_quorum = return_early_on_quorum
+        self.cohort_cache_size = cohort_cache_size
+        # (hash secret, lowercased target, cohort size, sorted perspective codes) -> cohorts; ordered by recency of use
+        self._cohort_cache: OrderedDict[tuple, list[list[RemotePerspective]]] = OrderedDict()
+
         self.logger = logger.getChild(self.__class__.__name__)
         if log_level is not None:
             self.logger.setLevel(log_level)
@@ -101,11 +116,10 @@ class MpicCoordinator:
                 max_attempts = self.global_max_attempts
         else:
             max_attempts = 1
-        attempts = 1
-        previous_attempt_results = None
+        previous_attempt_results = []
         cohort_cycle = cycle(perspective_cohorts)
 
-        while attempts <= max_attempts:
+        for attempts in range(1, max_attempts + 1):
             if cohort_to_use is not None:
                 perspectives_to_use = perspective_cohorts[cohort_to_use - 1]  # cohorts are 1-indexed for the user
             else:
@@ -115,28 +129,21 @@ class MpicCoordinator:
             async_calls_to_issue = MpicCoordinator.collect_checker_calls_to_issue(mpic_request, perspectives_to_use)
 
             perspective_responses = await self.call_checkers_and_collect_responses(
-                mpic_request, perspectives_to_use, async_calls_to_issue
+                mpic_request, perspectives_to_use, async_calls_to_issue, quorum_count
             )
 
             check_passed_per_perspective = {
                 response.perspective_code: response.check_response.check_passed for response in perspective_responses
             }
 
-            valid_perspective_count = sum(check_passed_per_perspective.values())
-            is_valid_result = valid_perspective_count >= quorum_count
-
             # noinspection PyUnresolvedReferences
             self.logger.trace(f"Perspectives used in attempt: \n%s", pformat(perspectives_to_use))
             # noinspection PyUnresolvedReferences
             self.logger.trace(f"Check passed per perspective: \n%s", pformat(check_passed_per_perspective))
 
-            # if cohort size is larger than 2, then at least two RIRs must be represented in the SUCCESSFUL perspectives
-            if len(perspectives_to_use) > 2:
-                valid_perspectives = [
-                    perspective for perspective in perspectives_to_use if check_passed_per_perspective[perspective.code]
-                ]
-                rir_count = len(set(perspective.rir for perspective in valid_perspectives))
-                is_valid_result = rir_count >= 2 and is_valid_result
+            is_valid_result = MpicCoordinator.is_quorum_met(
+                perspectives_to_use, check_passed_per_perspective, quorum_count
+            )
 
             if is_valid_result or attempts == max_attempts:
                 response = MpicResponseBuilder.build_response(
@@ -146,17 +153,14 @@ class MpicCoordinator:
                     attempts,
                     perspective_responses,
                     is_valid_result,
-                    previous_attempt_results,
+                    previous_attempt_results or None,  # None rather than empty if this was the first attempt
                 )
 
                 # noinspection PyUnresolvedReferences
                 self.logger.trace(f"Completed MPIC request with trace ID {mpic_request.trace_identifier}")
                 return response
-            else:
-                if previous_attempt_results is None:
-                    previous_attempt_results = []
-                previous_attempt_results.append(perspective_responses)
-                attempts += 1
+
+            previous_attempt_results.append(perspective_responses)
 
     def _raise_exception_on_invalid_request(self, mpic_request):
         is_request_valid, validation_issues = MpicRequestValidator.is_request_valid(
@@ -174,10 +178,29 @@ class MpicCoordinator:
         if cohort_size > len(target_perspectives):
             raise CohortCreationException(ErrorMessages.COHORT_CREATION_ERROR.message.format(cohort_size))
 
-        random_seed = hashlib.sha256((self.hash_secret + domain_or_ip_target.lower()).encode("utf-8")).digest()
-        perspectives_per_rir = CohortCreator.shuffle_available_perspectives_per_rir(target_perspectives, random_seed)
-        cohorts = CohortCreator.create_perspective_cohorts(perspectives_per_rir, cohort_size)
-        return cohorts
+        cache_key = (
+            self.hash_secret,
+            domain_or_ip_target.lower(),
+            cohort_size,
+            tuple(sorted(perspective.code for perspective in target_perspectives)),
+        )
+        cohorts = self._cohort_cache.get(cache_key)
+        if cohorts is not None:
+            self._cohort_cache.move_to_end(cache_key)
+        else:
+            # SHA-256 is only used as a seed here, but changing the hash would regroup every target's cohorts (and
+            # renumber them for callers using cohort_for_single_attempt), so it stays; it costs ~1us per request
+            random_seed = hashlib.sha256((self.hash_secret + domain_or_ip_target.lower()).encode("utf-8")).digest()
+            perspectives_per_rir = CohortCreator.shuffle_available_perspectives_per_rir(
+                target_perspectives, random_seed
+            )
+            cohorts = CohortCreator.create_perspective_cohorts(perspectives_per_rir, cohort_size)
+            if self.cohort_cache_size > 0:
+                self._cohort_cache[cache_key] = cohorts
+                while len(self._cohort_cache) > self.cohort_cache_size:
+                    self._cohort_cache.popitem(last=False)  # evict least recently used
+        # hand out copies of the cohort lists so that callers can't alter what's cached
+        return [list(cohort) for cohort in cohorts]
 
     # Determines the minimum required quorum size if none is specified in the request.
     @staticmethod
@@ -188,6 +211,21 @@ class MpicCoordinator:
             required_quorum_count = perspective_count - 1 if perspective_count <= 5 else perspective_count - 2
         return required_quorum_count
 
+    # Determines whether the perspectives that passed the check are enough to make the attempt valid.
+    @staticmethod
+    def is_quorum_met(perspectives_to_use, check_passed_per_perspective, quorum_count) -> bool:
+        valid_perspectives = [
+            perspective
+            for perspective in perspectives_to_use
+            if check_passed_per_perspective.get(perspective.code, False)
+        ]
+        if len(valid_perspectives) < quorum_count:
+            return False
+        # if cohort size is larger than 2, then at least two RIRs must be represented in the SUCCESSFUL perspectives
+        if len(perspectives_to_use) > 2:
+            return len(set(perspective.rir for perspective in valid_perspectives)) >= 2
+        return True
+
     # Configures the async remote perspective calls to issue for the check request.
     @staticmethod
     def collect_checker_calls_to_issue(
@@ -195,7 +233,6 @@ class MpicCoordinator:
     ) -> list[RemoteCheckCallConfiguration]:
         domain_or_ip_target = mpic_request.domain_or_ip_target
         check_type = mpic_request.check_type
-        async_calls_to_issue = []
 
         # check if mpic_request is an instance of MpicCaaRequest or MpicDcvRequest
         if check_type == CheckType.CAA:
@@ -211,24 +248,33 @@ class MpicCoordinator:
                 trace_identifier=mpic_request.trace_identifier,
             )
 
-        for perspective in perspectives_to_use:
-            call_config = RemoteCheckCallConfiguration(check_type, perspective, check_parameters)
-            async_calls_to_issue.append(call_config)
-
-        return async_calls_to_issue
+        # the same check_parameters instance is shared by every call; it is not modified per perspective
+        return [
+            RemoteCheckCallConfiguration(check_type, perspective, check_parameters)
+            for perspective in perspectives_to_use
+        ]
 
     async def call_remote_perspective(
-        self, call_remote_perspective_function, call_config: RemoteCheckCallConfiguration
+        self,
+        call_remote_perspective_function,
+        call_config: RemoteCheckCallConfiguration,
+        is_trace_timing_enabled: bool = True,
     ) -> PerspectiveResponse:
         """
         Async wrapper around the perspective call function.
         This assumes the wrapper will provide an async version of call_remote_perspective_function,
         or that we'll wrap the sync function using asyncio.to_thread() if needed.
+        :param is_trace_timing_enabled: lets callers fanning out to many perspectives check the log level once
+               for all of them, rather than once per perspective.
         """
         try:
             # noinspection PyUnresolvedReferences
-            async with self.logger.trace_timing(
-                f"MPIC round-trip with perspective {call_config.perspective.code}; trace ID: {call_config.check_request.trace_identifier}"
+            async with (
+                self.logger.trace_timing(
+                    f"MPIC round-trip with perspective {call_config.perspective.code}; trace ID: {call_config.check_request.trace_identifier}"
+                )
+                if is_trace_timing_enabled
+                else nullcontext()
             ):
                 response = await call_remote_perspective_function(
                     call_config.perspective, call_config.check_type, call_config.check_request
@@ -275,20 +321,33 @@ class MpicCoordinator:
 
     # Issues the async calls to the remote perspectives and collects the responses.
     async def call_checkers_and_collect_responses(
-        self, mpic_request, perspectives_to_use, async_calls_to_issue
+        self, mpic_request, perspectives_to_use, async_calls_to_issue, quorum_count=None
     ) -> list[PerspectiveResponse]:
         perspective_responses = []
-
-        tasks = [
-            self.call_remote_perspective(self.call_remote_perspective_function, call_config)
-            for call_config in async_calls_to_issue
-        ]
+        is_trace_timing_enabled = self.logger.isEnabledFor(TRACE_LEVEL)  # checked once for the whole fan-out
 
         # noinspection PyUnresolvedReferences
-        async with self.logger.trace_timing(
-            f"MPIC round-trip with {len(perspectives_to_use)} perspectives; trace ID: {mpic_request.trace_identifier}"
+        async with (
+            self.logger.trace_timing(
+                f"MPIC round-trip with {len(perspectives_to_use)} perspectives; trace ID: {mpic_request.trace_identifier}"
+            )
+            if is_trace_timing_enabled
+            else nullcontext()
         ):
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
+            if self.return_early_on_quorum and quorum_count is not None:
+                responses = await self.gather_responses_until_quorum_met(
+                    perspectives_to_use, async_calls_to_issue, quorum_count, is_trace_timing_enabled
+                )
+            else:
+                responses = await asyncio.gather(
+                    *(
+                        self.call_remote_perspective(
+                            self.call_remote_perspective_function, call_config, is_trace_timing_enabled
+                        )
+                        for call_config in async_calls_to_issue
+                    ),
+                    return_exceptions=True,
+                )
 
         for response in responses:
             # check for exception (return_exceptions=True above will return exceptions as responses)
@@ -305,3 +364,47 @@ class MpicCoordinator:
                 perspective_responses.append(response)
 
         return perspective_responses
+
+    # Like asyncio.gather(..., return_exceptions=True), but cancels the calls still outstanding once quorum is met.
+    # Cut-off calls are returned as RemoteCheckExceptions, so responses still line up with async_calls_to_issue.
+    async def gather_responses_until_quorum_met(
+        self, perspectives_to_use, async_calls_to_issue, quorum_count, is_trace_timing_enabled=True
+    ):
+        tasks = [
+            asyncio.ensure_future(
+                self.call_remote_perspective(
+                    self.call_remote_perspective_function, call_config, is_trace_timing_enabled
+                )
+            )
+            for call_config in async_calls_to_issue
+        ]
+        check_passed_per_perspective = {}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        response = task.result()
+                        check_passed_per_perspective[response.perspective_code] = response.check_response.check_passed
+                if MpicCoordinator.is_quorum_met(perspectives_to_use, check_passed_per_perspective, quorum_count):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        responses = []
+        for task, call_config in zip(tasks, async_calls_to_issue):
+            if task.cancelled():
+                # either cut off here, or cancelled from within the remote call itself
+                reason = "was not awaited as quorum was already met" if task in pending else "was cancelled"
+                responses.append(
+                    RemoteCheckException(
+                        f"Check for perspective {call_config.perspective.code} {reason}; trace ID: {call_config.check_request.trace_identifier}",
+                        call_config=call_config,
+                    )
+                )
+            else:
+                responses.append(task.exception() or task.result())
+        return responses
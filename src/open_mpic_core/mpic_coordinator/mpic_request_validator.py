@@ -50,20 +50,20 @@ class MpicRequestValidator:
     @staticmethod
     def is_requested_perspective_count_valid(requested_perspective_count, target_perspectives) -> bool:
         # check if requested_perspective_count is an integer, at least 2, and at most the number of known_perspectives
-        return isinstance(requested_perspective_count, int) and 2 <= requested_perspective_count <= len(
-            target_perspectives
-        )
+        # (here and below, type() rather than isinstance(): pydantic already hands over a plain int, and a bool is not
+        # a count)
+        return type(requested_perspective_count) is int and 2 <= requested_perspective_count <= len(target_perspectives)
 
     @staticmethod
     def is_requested_cohort_for_single_attempt_valid(cohort_for_single_attempt, number_of_cohorts) -> bool:
         # check if cohort_for_single_attempt is an integer and is within the number of available cohorts
-        return isinstance(cohort_for_single_attempt, int) and 1 <= cohort_for_single_attempt <= number_of_cohorts
+        return type(cohort_for_single_attempt) is int and 1 <= cohort_for_single_attempt <= number_of_cohorts
 
     @staticmethod
     def validate_quorum_count(requested_perspective_count, quorum_count, request_validation_issues) -> None:
         # quorum_count can be no less than perspectives-1 if perspectives <= 5
         # quorum_count can be no less than perspectives-2 if perspectives > 5
-        quorum_is_valid = isinstance(quorum_count, int) and (
+        quorum_is_valid = type(quorum_count) is int and (
             (requested_perspective_count - 1 <= quorum_count <= requested_perspective_count <= 5)
             or (4 <= requested_perspective_count - 2 <= quorum_count <= requested_perspective_count)
         )
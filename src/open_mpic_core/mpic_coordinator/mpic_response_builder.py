@@ -1,9 +1,19 @@
 from typing import List
 from open_mpic_core import MpicEffectiveOrchestrationParameters
-from open_mpic_core import MpicRequest, MpicDcvRequest
+from open_mpic_core import MpicRequest, MpicCaaRequest, MpicDcvRequest
 from open_mpic_core import MpicCaaResponse, MpicDcvResponse, MpicResponse
 from open_mpic_core import PerspectiveResponse
 
+# keyed by exact request type (no isinstance() semantics, because of inheritance); any other request is treated as CAA
+_RESPONSE_FACTORIES = {
+    MpicDcvRequest: lambda request, **fields: MpicDcvResponse(
+        dcv_check_parameters=request.dcv_check_parameters, **fields
+    ),
+    MpicCaaRequest: lambda request, **fields: MpicCaaResponse(
+        caa_check_parameters=request.caa_check_parameters, **fields
+    ),
+}
+
 
 class MpicResponseBuilder:
     @staticmethod
@@ -20,24 +30,20 @@ class MpicResponseBuilder:
             perspective_count=perspective_count, quorum_count=quorum_count, attempt_count=attempts
         )
 
-        if type(request) is MpicDcvRequest:  # type() instead of isinstance() because of inheritance
-            response = MpicDcvResponse(
-                dcv_check_parameters=request.dcv_check_parameters,
-            )
-        else:
-            response = MpicCaaResponse(
-                caa_check_parameters=request.caa_check_parameters,
-            )
-
-        response.domain_or_ip_target = request.domain_or_ip_target
-        response.request_orchestration_parameters = request.orchestration_parameters
-        response.actual_orchestration_parameters = actual_orchestration_parameters
-        response.is_valid = is_result_valid
-        response.perspectives = perspective_responses
-        response.trace_identifier = request.trace_identifier
-        response.previous_attempt_results = previous_attempt_results
-        response.mpic_completed = MpicResponseBuilder.enough_perspectives_completed(
-            perspective_count, perspective_responses, quorum_count
+        # all fields in one constructor call, so the model is built (and validated) once
+        response_factory = _RESPONSE_FACTORIES.get(type(request), _RESPONSE_FACTORIES[MpicCaaRequest])
+        response = response_factory(
+            request,
+            domain_or_ip_target=request.domain_or_ip_target,
+            request_orchestration_parameters=request.orchestration_parameters,
+            actual_orchestration_parameters=actual_orchestration_parameters,
+            is_valid=is_result_valid,
+            perspectives=perspective_responses,
+            trace_identifier=request.trace_identifier,
+            previous_attempt_results=previous_attempt_results,
+            mpic_completed=MpicResponseBuilder.enough_perspectives_completed(
+                perspective_count, perspective_responses, quorum_count
+            ),
         )
 
         return response
@@ -150,9 +150,7 @@ class DcvTlsAlpnValidator:
                     dcv_check_response.details.common_name = common_name  # Cert common name for logging info.
 
                     self.logger.debug(f"tls-alpn-01: passed? {dcv_check_response.check_passed}")
-                dcv_check_response.timestamp_ns = time.time_ns()
         except asyncio.TimeoutError as e:
-            dcv_check_response.timestamp_ns = time.time_ns()
             log_message = f"Timeout connecting to {hostname}: {str(e)}. Trace identifier: {request.trace_identifier}"
             self.logger.warning(log_message)
             message = f"Connection timed out while attempting to connect to {hostname}"
@@ -161,11 +159,11 @@ class DcvTlsAlpnValidator:
             ]
         except (ClientError, HTTPException, OSError) as e:
             self.logger.error(traceback.format_exc())
-            dcv_check_response.timestamp_ns = time.time_ns()
             dcv_check_response.errors = [
                 MpicValidationError.create(ErrorMessages.DCV_LOOKUP_ERROR, e.__class__.__name__, str(e))
             ]
 
+        dcv_check_response.timestamp_ns = time.time_ns()  # once, whichever way the check went
         return dcv_check_response
 
     def _validate_san_entry(
@@ -1,9 +1,12 @@
 import asyncio
+import functools
 import time
+import contextlib
 from contextlib import asynccontextmanager
+from http import HTTPStatus
+from typing import Final
 
 import dns.asyncresolver
-import requests
 import re
 import aiohttp
 import base64
@@ -17,13 +20,19 @@ from aiohttp.web import HTTPException
 from open_mpic_core import DcvCheckRequest, DcvCheckResponse
 from open_mpic_core import RedirectResponse, DcvUtils
 from open_mpic_core import DcvValidationMethod, DnsRecordType
+from open_mpic_core import DcvWebsiteChangeValidationParameters, DcvAcmeHttp01ValidationParameters
 from open_mpic_core import MpicValidationError, ErrorMessages
-from open_mpic_core import DomainEncoder
+from open_mpic_core import DomainEncoder, DomainTreeWalker, InflightLookups
 from open_mpic_core import DcvTlsAlpnValidator
 from open_mpic_core import get_logger
 
 logger = get_logger(__name__)
 
+# parsed once at import time rather than via dns.rdatatype.from_text() on every check
+RDATA_TYPE_BY_DNS_RECORD_TYPE = {record_type: dns.rdatatype.from_text(record_type) for record_type in DnsRecordType}
+# HTTP-based validation only ever reads the first few hundred bytes of a body, so there's no use buffering 64 KiB of it
+HTTP_READ_BUFSIZE: Final[int] = 4096
+
 
 class ExpectedDnsRecordContent:
     def __init__(self, expected_value=None, possible_values=None, expected_parameters=None):
@@ -40,6 +49,8 @@ class MpicDcvChecker:
     WELL_KNOWN_ACME_PATH = ".well-known/acme-challenge"
     CONTACT_EMAIL_TAG = "contactemail"
     CONTACT_PHONE_TAG = "contactphone"
+    CONTACT_EMAIL_TAG_BYTES = CONTACT_EMAIL_TAG.encode()
+    CONTACT_PHONE_TAG_BYTES = CONTACT_PHONE_TAG.encode()
     # acme_tls_alpn related constants are in ./dcv_tls_alpn_validator.py
 
     def __init__(
@@ -49,8 +60,57 @@ class MpicDcvChecker:
         log_level: int = None,
         dns_timeout: float = None,
         dns_resolution_lifetime: float = None,
+        http_connection_limit: int = 0,
+        http_dns_cache_ttl: int | None = 10,
+        dns_cache_size: int = 0,
+        include_http_response_page: bool = True,
+        dns_stop_on_match: bool = False,
+        speculative_parent_lookups: bool = False,
+        http_range_requests: bool = False,
+        http_keepalive_timeout: float | None = None,
+        dns_race_nameservers: list[str] | None = None,
+        share_http_client: bool = False,
+        max_concurrent_dns_queries: int = 64,
     ):
+        """
+        :param http_connection_limit: max number of simultaneous HTTP connections (0 means no limit). Per-host
+               connections are never limited separately, as each check targets its own host.
+        :param http_dns_cache_ttl: seconds for which HTTP hostname resolutions are reused (None caches forever).
+        :param dns_cache_size: max number of DNS answers (including NXDOMAIN) to cache within their TTL for DNS-based
+               validation (0 disables caching). Off by default so that a retried check always sees record changes.
+               With caching on, concurrent identical lookups also share a single query.
+        :param include_http_response_page: whether HTTP-based validation results carry the (base64 encoded) start of
+               the page that was fetched, in details.response_page.
+        :param dns_stop_on_match: whether DNS-based validation stops reading answer records once one matches the
+               expected value; details.records_seen then ends at the matching record instead of listing all records.
+        :param speculative_parent_lookups: if True and the target itself has no CAA records, contact info CAA checks
+               query all of its ancestors at once rather than one label at a time (same result, lower latency).
+        :param http_range_requests: if True, HTTP-based validation asks for just the bytes it evaluates (via a Range
+               header, unless the request already has one) and accepts a 206 Partial Content response as well.
+        :param http_keepalive_timeout: seconds for which idle HTTP connections are kept for reuse by later checks
+               against the same host (so only of use along with share_http_client). None (the default) closes the
+               connection after every check.
+        :param dns_race_nameservers: IP addresses of recursive resolvers to query in parallel for every DNS lookup. The
+               first conclusive result (an answer, NXDOMAIN or no answer) is used and the other queries are cancelled;
+               a resolver that fails (e.g., times out) just drops out of the race. None (the default) uses the system
+               resolver configuration as is.
+        :param share_http_client: if True, HTTP-based checks running on the same event loop share one HTTP client
+               (connector, DNS cache and, with http_keepalive_timeout, connections) instead of each opening and closing
+               its own. The shared client is left open, so call close_async_http_client() before the loop ends. A
+               client still open on a loop that has since ended is released when a check on a new loop replaces it.
+        :param max_concurrent_dns_queries: max number of DNS lookups (each one raced across dns_race_nameservers, if
+               given) this checker will have in flight at once, to stay within the query rate the upstream resolver
+               will tolerate.
+        """
         self.verify_ssl = verify_ssl
+        self._http_connection_limit = http_connection_limit
+        self._http_dns_cache_ttl = http_dns_cache_ttl
+        self.include_http_response_page = include_http_response_page
+        self.dns_stop_on_match = dns_stop_on_match
+        self.speculative_parent_lookups = speculative_parent_lookups
+        self.http_range_requests = http_range_requests
+        self._http_keepalive_timeout = http_keepalive_timeout
+        self.share_http_client = share_http_client
         self._async_http_client = None
         self._http_client_loop = None  # track which loop the http client was created on
 
@@ -58,29 +118,144 @@ class MpicDcvChecker:
         if log_level is not None:
             self.logger.setLevel(log_level)
 
-        self.resolver = dns.asyncresolver.get_default_resolver()
+        # a dedicated resolver per checker, so as not to mutate the process-wide default resolver's settings
+        self.resolver = dns.asyncresolver.Resolver()
+        if dns_cache_size > 0:
+            self.resolver.cache = dns.resolver.LRUCache(dns_cache_size)
+        self._coalesce_dns_lookups = dns_cache_size > 0
+        # lookups in progress, keyed by (name, record type, whether the tree is walked); used along with caching
+        self._inflight_dns_lookups = InflightLookups()
         self.resolver.timeout = dns_timeout if dns_timeout is not None else self.resolver.timeout
         self.resolver.lifetime = (
             dns_resolution_lifetime if dns_resolution_lifetime is not None else self.resolver.lifetime
         )
+        self._max_concurrent_dns_queries = max_concurrent_dns_queries
+        # asyncio primitives bind to the loop they're first contended on, so keep one per loop (see below)
+        self._dns_query_semaphore = None
+        self._dns_query_semaphore_loop = None
+        # resolvers queried for every DNS lookup; more than one only when racing nameservers
+        self.dns_resolvers = [self.resolver]
+        if dns_race_nameservers:
+            self.resolver.nameservers = [dns_race_nameservers[0]]
+            for nameserver in dns_race_nameservers[1:]:
+                racing_resolver = dns.asyncresolver.Resolver(configure=False)
+                racing_resolver.nameservers = [nameserver]
+                racing_resolver.timeout = self.resolver.timeout
+                racing_resolver.lifetime = self.resolver.lifetime
+                racing_resolver.cache = self.resolver.cache  # shared, so any resolver's answer serves all of them
+                self.dns_resolvers.append(racing_resolver)
         self.acme_tls_alpn_validator = DcvTlsAlpnValidator(log_level=log_level)
         self._http_client_timeout = http_client_timeout
 
+        # validation method -> handler; methods not listed here are DNS based
+        self._validation_handlers = {
+            DcvValidationMethod.WEBSITE_CHANGE: self.perform_http_based_validation,
+            DcvValidationMethod.ACME_HTTP_01: self.perform_http_based_validation,
+            DcvValidationMethod.ACME_TLS_ALPN_01: self.perform_tls_alpn_validation,
+        }
+        # HTTP-based validation method -> builder of (token URL, expected response content)
+        self._http_lookup_builders = {
+            DcvValidationMethod.WEBSITE_CHANGE: MpicDcvChecker.build_website_change_lookup,
+            DcvValidationMethod.ACME_HTTP_01: MpicDcvChecker.build_acme_http_01_lookup,
+        }
+
     @asynccontextmanager
     async def get_async_http_client(self):
-        connector = aiohttp.TCPConnector(ssl=self.verify_ssl, limit=0, force_close=True)
+        """
+        Yields an HTTP client for a check: a new one that is closed again afterward, or, with share_http_client, the
+        client shared by all checks running on the current event loop. The shared client is created when first needed
+        (or when the loop has changed since, e.g. across separate asyncio.run() calls) and left open.
+        """
+        if not self.share_http_client:
+            async_http_client = self.create_async_http_client()
+            try:
+                yield async_http_client
+            finally:
+                await async_http_client.close()
+            return
+
+        current_loop = asyncio.get_running_loop()
+        if (
+            self._async_http_client is None
+            or self._async_http_client.closed
+            or self._http_client_loop is not current_loop
+        ):
+            await self.release_stale_async_http_client()
+            self._async_http_client = self.create_async_http_client()
+            self._http_client_loop = current_loop
+        yield self._async_http_client
+
+    def create_async_http_client(self) -> aiohttp.ClientSession:
+        # No resolver passed in on purpose: aiohttp's default resolves hostnames via aiodns (c-ares) when it's installed
+        # (see the "speedups" extra), and only falls back to getaddrinfo in its thread pool otherwise.
+        if self._http_keepalive_timeout is None:
+            # no keep-alive: every request opens a connection of its own and closes it after, whether the client is
+            # per check (the default) or shared, in which case only the connector and its DNS cache carry over
+            keepalive_settings = {"force_close": True}
+        else:
+            keepalive_settings = {"keepalive_timeout": self._http_keepalive_timeout}
+        connector = aiohttp.TCPConnector(
+            ssl=self.verify_ssl,
+            limit=self._http_connection_limit,
+            limit_per_host=0,
+            use_dns_cache=True,
+            ttl_dns_cache=self._http_dns_cache_ttl,
+            **keepalive_settings,
+        )
         dummy_cookie_jar = aiohttp.DummyCookieJar()  # disable cookie processing
-        client = aiohttp.ClientSession(
+        return aiohttp.ClientSession(
             connector=connector,
             timeout=aiohttp.ClientTimeout(total=self._http_client_timeout),
             trust_env=True,
             cookie_jar=dummy_cookie_jar,
+            read_bufsize=HTTP_READ_BUFSIZE,
         )
-        try:
-            yield client
-        finally:
-            if not client.closed:
-                await client.close()
+
+    async def close_async_http_client(self):
+        """
+        Closes the shared HTTP client, if it's open. Call this (on the client's event loop) when done with the checker.
+        """
+        if self._async_http_client is not None and self._http_client_loop is asyncio.get_running_loop():
+            await self._async_http_client.close()
+            self._async_http_client = None
+            self._http_client_loop = None
+        else:
+            await self.release_stale_async_http_client()
+
+    async def release_stale_async_http_client(self):
+        """
+        Lets go of a shared HTTP client left open on an event loop other than the current one, which can't be awaited
+        from here. If that loop has ended (as at the end of an asyncio.run() call), its connections went with it, so
+        the client is detached from its connector and the connector marked closed. If it's stopped but not closed, it
+        is run (in a worker thread) just long enough to close the client. If it's running on another thread, it's
+        asked to close the client there. A failure to close the client is logged.
+        """
+        stale_client, stale_loop = self._async_http_client, self._http_client_loop
+        self._async_http_client = None
+        self._http_client_loop = None
+        if stale_client is None or stale_client.closed:
+            return
+        if stale_loop.is_closed():
+            connector = stale_client.connector
+            stale_client.detach()  # so that the client isn't reported as unclosed once garbage collected
+            if connector is not None:
+                await connector.close()  # a no-op wait, as the connector's loop is closed
+        elif stale_loop.is_running():
+            close_future = asyncio.run_coroutine_threadsafe(stale_client.close(), stale_loop)
+            close_future.add_done_callback(
+                lambda future: self._log_stale_async_http_client_close_failure(
+                    None if future.cancelled() else future.exception()
+                )
+            )
+        else:
+            try:
+                await asyncio.to_thread(lambda: stale_loop.run_until_complete(stale_client.close()))
+            except Exception as e:
+                self._log_stale_async_http_client_close_failure(e)
+
+    def _log_stale_async_http_client_close_failure(self, error: BaseException | None) -> None:
+        if error is not None:
+            self.logger.warning(f"Failed to close stale HTTP client: {error.__class__.__name__} {str(error)}")
 
     async def check_dcv(self, dcv_request: DcvCheckRequest) -> DcvCheckResponse:
         validation_method = dcv_request.dcv_check_parameters.validation_method
@@ -95,14 +270,8 @@ class MpicDcvChecker:
         # encode domain if needed
         dcv_request.domain_or_ip_target = DomainEncoder.prepare_target_for_lookup(dcv_request.domain_or_ip_target)
 
-        result = None
-        match validation_method:
-            case DcvValidationMethod.WEBSITE_CHANGE | DcvValidationMethod.ACME_HTTP_01:
-                result = await self.perform_http_based_validation(dcv_request)
-            case DcvValidationMethod.ACME_TLS_ALPN_01:
-                result = await self.acme_tls_alpn_validator.perform_tls_alpn_validation(dcv_request)
-            case _:  # all DNS based methods
-                result = await self.perform_general_dns_validation(dcv_request)
+        handler = self._validation_handlers.get(validation_method, self.perform_general_dns_validation)
+        result = await handler(dcv_request)
 
         # noinspection PyUnresolvedReferences
         self.logger.trace(
@@ -113,6 +282,9 @@ class MpicDcvChecker:
         )
         return result
 
+    async def perform_tls_alpn_validation(self, request: DcvCheckRequest) -> DcvCheckResponse:
+        return await self.acme_tls_alpn_validator.perform_tls_alpn_validation(request)
+
     async def perform_general_dns_validation(self, request: DcvCheckRequest) -> DcvCheckResponse:
         check_parameters = request.dcv_check_parameters
         validation_method = check_parameters.validation_method
@@ -120,7 +292,7 @@ class MpicDcvChecker:
         dns_record_type = check_parameters.dns_record_type
         exact_match = True
 
-        if dns_name_prefix is not None and len(dns_name_prefix) > 0:
+        if dns_name_prefix:
             name_to_resolve = f"{dns_name_prefix}.{request.domain_or_ip_target}"
         else:
             name_to_resolve = request.domain_or_ip_target
@@ -150,6 +322,7 @@ class MpicDcvChecker:
                 expected_dns_record_content,
                 exact_match,
                 require_exact_case,
+                self.dns_stop_on_match,
             )
         except dns.exception.DNSException as e:
             log_msg = f"DNS lookup error for {name_to_resolve}: {str(e)}. Trace ID: {request.trace_identifier}"
@@ -172,23 +345,75 @@ class MpicDcvChecker:
             DcvValidationMethod.CONTACT_PHONE_CAA,
         ]
 
-        dns_rdata_type = dns.rdatatype.from_text(dns_record_type)
+        dns_rdata_type = RDATA_TYPE_BY_DNS_RECORD_TYPE[dns_record_type]
+        if not self._coalesce_dns_lookups:
+            return await self.resolve_dns_name(name_to_resolve, dns_rdata_type, walk_domain_tree)
+
+        lookup_key = (name_to_resolve.lower(), dns_rdata_type, walk_domain_tree)
+        return await self._inflight_dns_lookups.run(
+            lookup_key, lambda: self.resolve_dns_name(name_to_resolve, dns_rdata_type, walk_domain_tree)
+        )
+
+    async def resolve_dns_name(self, name_to_resolve, dns_rdata_type, walk_domain_tree) -> dns.resolver.Answer:
         lookup = None
 
         if walk_domain_tree:
             domain = dns.name.from_text(name_to_resolve)
 
+            if self.speculative_parent_lookups:
+                lookup, _ = await DomainTreeWalker.walk_speculatively(
+                    domain, lambda name: self.query_dns_resolvers(name, dns_rdata_type)
+                )
+                return lookup
+
             while domain != dns.name.root:
                 try:
-                    lookup = await self.resolver.resolve(qname=domain, rdtype=dns_rdata_type)
+                    lookup = await self.query_dns_resolvers(domain, dns_rdata_type)
                     break
                 except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
                     domain = domain.parent()
         else:
             domain = dns.name.from_text(name_to_resolve)  # to ensure trailing dot is added
-            lookup = await self.resolver.resolve(qname=domain, rdtype=dns_rdata_type)
+            lookup = await self.query_dns_resolvers(domain, dns_rdata_type)
         return lookup
 
+    async def query_dns_resolvers(self, qname: dns.name.Name, dns_rdata_type) -> dns.resolver.Answer:
+        async with self.get_dns_query_semaphore():
+            return await self.race_dns_resolvers(qname, dns_rdata_type)
+
+    def get_dns_query_semaphore(self) -> asyncio.Semaphore:
+        """
+        Returns the semaphore bounding the DNS lookups in flight on the current event loop, creating it when first
+        needed (or when the loop has changed since, e.g. across separate asyncio.run() calls).
+        """
+        current_loop = asyncio.get_running_loop()
+        if self._dns_query_semaphore is None or self._dns_query_semaphore_loop is not current_loop:
+            self._dns_query_semaphore = asyncio.Semaphore(self._max_concurrent_dns_queries)
+            self._dns_query_semaphore_loop = current_loop
+        return self._dns_query_semaphore
+
+    async def race_dns_resolvers(self, qname: dns.name.Name, dns_rdata_type) -> dns.resolver.Answer:
+        if len(self.dns_resolvers) == 1:
+            return await self.resolver.resolve(qname=qname, rdtype=dns_rdata_type)
+
+        lookup_tasks = [
+            asyncio.create_task(resolver.resolve(qname=qname, rdtype=dns_rdata_type)) for resolver in self.dns_resolvers
+        ]
+        try:
+            lookup_error = None
+            for lookup_task in asyncio.as_completed(lookup_tasks):
+                try:
+                    return await lookup_task
+                except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                    raise  # conclusive about the name, so no use waiting on the other resolvers
+                except dns.exception.DNSException as e:
+                    lookup_error = e  # only this resolver failed; the others may still answer
+            raise lookup_error
+        finally:
+            for lookup_task in lookup_tasks:
+                lookup_task.cancel()
+            await asyncio.gather(*lookup_tasks, return_exceptions=True)
+
     @staticmethod
     def format_host_for_url(domain_or_ip_target: str) -> str:
         """Format host for URL, wrapping IPv6 addresses in square brackets if needed."""
@@ -205,19 +430,12 @@ class MpicDcvChecker:
         domain_or_ip_target = request.domain_or_ip_target
         formatted_host = MpicDcvChecker.format_host_for_url(domain_or_ip_target)
         http_headers = request.dcv_check_parameters.http_headers
-        if validation_method == DcvValidationMethod.WEBSITE_CHANGE:
-            expected_response_content = request.dcv_check_parameters.challenge_value
-            url_scheme = request.dcv_check_parameters.url_scheme
-            token_path = request.dcv_check_parameters.http_token_path
-            token_url = (
-                f"{url_scheme}://{formatted_host}/{MpicDcvChecker.WELL_KNOWN_PKI_PATH}/{token_path}"  # noqa E501 (http)
-            )
-            dcv_check_response = DcvUtils.create_empty_check_response(DcvValidationMethod.WEBSITE_CHANGE)
-        else:
-            expected_response_content = request.dcv_check_parameters.key_authorization
-            token = request.dcv_check_parameters.token
-            token_url = f"http://{formatted_host}/{MpicDcvChecker.WELL_KNOWN_ACME_PATH}/{token}"  # noqa E501 (http)
-            dcv_check_response = DcvUtils.create_empty_check_response(DcvValidationMethod.ACME_HTTP_01)
+        build_http_lookup = self._http_lookup_builders[validation_method]
+        token_url, expected_response_content = build_http_lookup(request.dcv_check_parameters, formatted_host)
+        dcv_check_response = DcvUtils.create_empty_check_response(validation_method)
+        if self.http_range_requests and not any(header.lower() == "range" for header in http_headers or {}):
+            bytes_to_read = MpicDcvChecker.get_http_bytes_to_read(request, expected_response_content)
+            http_headers = {**(http_headers or {}), "Range": f"bytes=0-{bytes_to_read - 1}"}
         try:
             async with self.get_async_http_client() as async_http_client:
                 # noinspection PyUnresolvedReferences
@@ -226,7 +444,13 @@ class MpicDcvChecker:
                 ):
                     async with async_http_client.get(url=token_url, headers=http_headers, max_redirects=20) as response:
                         dcv_check_response = await MpicDcvChecker.evaluate_http_lookup_response(
-                            request, dcv_check_response, response, token_url, expected_response_content
+                            request,
+                            dcv_check_response,
+                            response,
+                            token_url,
+                            expected_response_content,
+                            self.include_http_response_page,
+                            self.http_range_requests,
                         )
         except asyncio.TimeoutError as e:
             dcv_check_response.timestamp_ns = time.time_ns()
@@ -246,6 +470,25 @@ class MpicDcvChecker:
 
         return dcv_check_response
 
+    @staticmethod
+    def build_website_change_lookup(
+        check_parameters: DcvWebsiteChangeValidationParameters, formatted_host: str
+    ) -> tuple[str, str]:
+        url_scheme = check_parameters.url_scheme
+        token_path = check_parameters.http_token_path
+        token_url = (
+            f"{url_scheme}://{formatted_host}/{MpicDcvChecker.WELL_KNOWN_PKI_PATH}/{token_path}"  # noqa E501 (http)
+        )
+        return token_url, check_parameters.challenge_value
+
+    @staticmethod
+    def build_acme_http_01_lookup(
+        check_parameters: DcvAcmeHttp01ValidationParameters, formatted_host: str
+    ) -> tuple[str, str]:
+        token = check_parameters.token
+        token_url = f"http://{formatted_host}/{MpicDcvChecker.WELL_KNOWN_ACME_PATH}/{token}"  # noqa E501 (http)
+        return token_url, check_parameters.key_authorization
+
     @staticmethod
     async def evaluate_http_lookup_response(
         dcv_check_request: DcvCheckRequest,
@@ -253,44 +496,39 @@ class MpicDcvChecker:
         http_response: aiohttp.ClientResponse,
         target_url: str,
         challenge_value: str,
+        include_response_page: bool = True,
+        accept_partial_content: bool = False,
     ):
         dcv_check_response.timestamp_ns = time.time_ns()
         dcv_check_response.check_completed = True
         response_history = None
 
-        if http_response.status != requests.codes.OK:
+        if http_response.status != HTTPStatus.OK and not (
+            accept_partial_content and http_response.status == HTTPStatus.PARTIAL_CONTENT
+        ):
             dcv_check_response.errors = [
                 MpicValidationError.create(
                     ErrorMessages.GENERAL_HTTP_ERROR, str(http_response.status), http_response.reason
                 )
             ]
         else:
-            if (
-                hasattr(http_response, "history")
-                and http_response.history is not None
-                and len(http_response.history) > 0
-            ):
+            if http_response.history:  # always a (possibly empty) tuple on aiohttp.ClientResponse
+                redirect_response = RedirectResponse  # local, rather than a global lookup per redirect
                 response_history = [
-                    RedirectResponse(status_code=resp.status, url=resp.headers["Location"])
+                    redirect_response(status_code=resp.status, url=resp.headers["Location"])
                     for resp in http_response.history
                 ]
                 MpicDcvChecker.set_errors_on_invalid_response_history(dcv_check_response, response_history)
 
         if dcv_check_response.errors is None:
             match_regex = None
-            bytes_to_read = max(100, len(challenge_value))  # read up to 100 bytes, unless challenge value is larger
-
             validation_method = dcv_check_request.dcv_check_parameters.validation_method
             if validation_method == DcvValidationMethod.WEBSITE_CHANGE:
                 match_regex = dcv_check_request.dcv_check_parameters.match_regex
-                if match_regex is not None and len(match_regex) > 0:
-                    # read up to 100 bytes, unless challenge_value or match_regex is larger
-                    bytes_to_read = max(100, len(challenge_value), len(match_regex))
+            bytes_to_read = MpicDcvChecker.get_http_bytes_to_read(dcv_check_request, challenge_value)
 
             content = await http_response.content.read(bytes_to_read)
-            # set internal _content to leverage decoding capabilities of ClientResponse.text without reading the entire response
-            http_response._body = content
-            response_text = await http_response.text()
+            response_text = MpicDcvChecker.decode_http_response_content(http_response, content)
             result = response_text.strip()
 
             if validation_method == DcvValidationMethod.ACME_HTTP_01:
@@ -300,24 +538,47 @@ class MpicDcvChecker:
                 # For WEBSITE_CHANGE: substring check; case-sensitive by default, unless require_exact_case=False
                 require_exact_case = dcv_check_request.dcv_check_parameters.require_exact_case
                 if require_exact_case:
-                    dcv_check_response.check_passed = challenge_value in result
+                    challenge_value_found = challenge_value in result
                 else:
-                    dcv_check_response.check_passed = challenge_value.lower() in result.lower()
-                if match_regex is not None and len(match_regex) > 0:
-                    match = re.search(match_regex, result)
-                    challenge_value_found = (
-                        challenge_value in result if require_exact_case else challenge_value.lower() in result.lower()
-                    )
-                    dcv_check_response.check_passed = challenge_value_found and match is not None
+                    challenge_value_found = challenge_value.lower() in result.lower()
+                # if there is a match_regex, it must match too (only searched for once the challenge value is found)
+                dcv_check_response.check_passed = challenge_value_found and (
+                    not match_regex or MpicDcvChecker.compile_match_regex(match_regex).search(result) is not None
+                )
             dcv_check_response.details.response_status_code = http_response.status
             dcv_check_response.details.response_url = target_url
             dcv_check_response.details.response_history = response_history
-            dcv_check_response.details.response_page = base64.b64encode(content).decode()
+            if include_response_page:
+                dcv_check_response.details.response_page = base64.b64encode(content).decode()
 
             http_response.close()  # ensure connection is closed
 
         return dcv_check_response
 
+    @staticmethod
+    def decode_http_response_content(http_response: aiohttp.ClientResponse, content: bytes) -> str:
+        # same outcome as ClientResponse.text() with the session's default fallback charset (utf-8), but for just the
+        # bytes read, and without having to plant them in the response's (private) body first
+        charset = http_response.charset
+        if charset:
+            with contextlib.suppress(LookupError):
+                return content.decode(charset)
+        return content.decode("utf-8")
+
+    @staticmethod
+    def get_http_bytes_to_read(dcv_check_request: DcvCheckRequest, challenge_value: str) -> int:
+        # read up to 100 bytes, unless challenge_value (or match_regex, for WEBSITE_CHANGE) is larger
+        check_parameters = dcv_check_request.dcv_check_parameters
+        if check_parameters.validation_method == DcvValidationMethod.WEBSITE_CHANGE and check_parameters.match_regex:
+            return max(100, len(challenge_value), len(check_parameters.match_regex))
+        return max(100, len(challenge_value))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def compile_match_regex(match_regex: str) -> re.Pattern:
+        # re's own pattern cache is small and shared process-wide, so keep the (few, repeated) match_regex values here
+        return re.compile(match_regex)
+
     @staticmethod
     def set_errors_on_invalid_response_history(dcv_check_response, response_history):
         """check if redirects included non-authorized response codes or ports and set errors if so"""
@@ -340,6 +601,7 @@ class MpicDcvChecker:
         expected_dns_record_content: ExpectedDnsRecordContent | None,
         exact_match: bool = True,
         require_exact_case: bool = False,
+        stop_on_match: bool = False,
     ) -> None:
         if dns_response is None:
             dcv_check_response.check_passed = False
@@ -347,23 +609,40 @@ class MpicDcvChecker:
             return  # no response to evaluate
         response_code = dns_response.response.rcode()
         records_as_strings = []
-        dns_rdata_type = dns.rdatatype.from_text(dns_record_type)
+        dns_rdata_type = RDATA_TYPE_BY_DNS_RECORD_TYPE[dns_record_type]
+        # CAA contact methods only look at records with a given tag; resolve which one once, outside the loop
+        if validation_method == DcvValidationMethod.CONTACT_EMAIL_CAA:
+            contact_tag = MpicDcvChecker.CONTACT_EMAIL_TAG_BYTES
+        elif validation_method == DcvValidationMethod.CONTACT_PHONE_CAA:
+            contact_tag = MpicDcvChecker.CONTACT_PHONE_TAG_BYTES
+        else:
+            contact_tag = None
+        extract_value_from_record = MpicDcvChecker.extract_value_from_record
+        # "special logic" validation methods need to see all records; the rest match record by record
+        if validation_method in (DcvValidationMethod.IP_ADDRESS, DcvValidationMethod.DNS_PERSISTENT):
+            record_matches = None
+        else:
+            record_matches = MpicDcvChecker.create_dns_record_matcher(
+                expected_dns_record_content.expected_value, exact_match, require_exact_case
+            )
+        stop_on_match = stop_on_match and record_matches is not None
+        match_found = False
         for response_answer in dns_response.response.answer:
             if response_answer.rdtype == dns_rdata_type:
                 for record_data in response_answer:
-                    if validation_method == DcvValidationMethod.CONTACT_EMAIL_CAA:
-                        if record_data.tag.decode("utf-8").lower() == MpicDcvChecker.CONTACT_EMAIL_TAG:
-                            record_data_as_string = record_data.value.decode("utf-8")
-                        else:
-                            continue
-                    elif validation_method == DcvValidationMethod.CONTACT_PHONE_CAA:
-                        if record_data.tag.decode("utf-8").lower() == MpicDcvChecker.CONTACT_PHONE_TAG:
+                    if contact_tag is not None:
+                        if record_data.tag.lower() == contact_tag:  # tags are ASCII, so compare as bytes
                             record_data_as_string = record_data.value.decode("utf-8")
                         else:
                             continue
                     else:
-                        record_data_as_string = MpicDcvChecker.extract_value_from_record(record_data)
+                        record_data_as_string = extract_value_from_record(record_data)
                     records_as_strings.append(record_data_as_string)
+                    if stop_on_match and record_matches(record_data_as_string):
+                        match_found = True
+                        break
+                if match_found:
+                    break
 
         dcv_check_response.details.response_code = response_code
         dcv_check_response.details.records_seen = records_as_strings
@@ -390,21 +669,26 @@ class MpicDcvChecker:
                 expected_dns_record_content, records_as_strings
             )
         else:
-            if require_exact_case:
-                expected_dns_value = expected_dns_record_content.expected_value
-            else:
-                expected_dns_value = expected_dns_record_content.expected_value.lower()  # case-insensitive
-                records_as_strings = [record.lower() for record in records_as_strings]
-
-            # exact_match=True requires at least one record matches and will fail even if whitespace is different.
-            # exact_match=False simply runs a contains check.
-            if exact_match:
-                dcv_check_response.check_passed = expected_dns_value in records_as_strings
-            else:
-                dcv_check_response.check_passed = any(expected_dns_value in record for record in records_as_strings)
+            # with stop_on_match, every collected record was already tested
+            dcv_check_response.check_passed = (
+                match_found if stop_on_match else any(map(record_matches, records_as_strings))
+            )
 
         dcv_check_response.check_completed = True
 
+    @staticmethod
+    def create_dns_record_matcher(expected_value: str, exact_match: bool, require_exact_case: bool):
+        # exact_match=True requires at least one record matches and will fail even if whitespace is different.
+        # exact_match=False simply runs a contains check.
+        if require_exact_case:
+            if exact_match:
+                return lambda record: record == expected_value
+            return lambda record: expected_value in record
+        expected_value = expected_value.lower()  # case-insensitive
+        if exact_match:
+            return lambda record: record.lower() == expected_value
+        return lambda record: expected_value in record.lower()
+
     @staticmethod
     def is_expected_ip_address_in_response(ip_address_as_string: str, records_as_strings: list[str]) -> bool:
         ip_address_found = False
@@ -6,7 +6,7 @@ import socket
 from unittest.mock import MagicMock, AsyncMock
 from io import StringIO
 from cryptography import x509
-from cryptography.x509 import SubjectAlternativeName, Extension, NameAttribute
+from cryptography.x509 import SubjectAlternativeName, Extension
 from cryptography.x509.oid import ExtensionOID
 
 from open_mpic_core import ErrorMessages, TRACE_LEVEL
@@ -85,6 +85,7 @@ class TestDcvTlsAlpnValidator:
         assert response.check_passed is False
         assert len(response.errors) == 1
         assert response.errors[0].error_message == ErrorMessages.TLS_ALPN_ERROR_CERTIFICATE_EXTENSION_MISSING.message
+        assert response.timestamp_ns is not None
 
     async def perform_tls_alpn_validation__should_fail_given_invalid_san_entry(self, mocker):
         dcv_request = ValidCheckCreator.create_valid_acme_tls_alpn_01_check_request()
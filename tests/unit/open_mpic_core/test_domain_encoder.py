@@ -78,3 +78,11 @@ class TestDomainEncoder:
     def prepare_domain_for_lookup__should_raise_value_error_given_malformed_domain(input_domain):
         with pytest.raises(ValueError):
             DomainEncoder.prepare_target_for_lookup(input_domain)
+
+    @staticmethod
+    def prepare_domain_for_lookup__should_reuse_result_for_repeated_target():
+        DomainEncoder.prepare_target_for_lookup.cache_clear()
+        first_result = DomainEncoder.prepare_target_for_lookup("bücher.example.de")
+        second_result = DomainEncoder.prepare_target_for_lookup("bücher.example.de")
+        assert first_result == second_result == "xn--bcher-kva.example.de"
+        assert DomainEncoder.prepare_target_for_lookup.cache_info().hits == 1
@@ -0,0 +1,33 @@
+import asyncio
+
+import dns.name
+import dns.resolver
+import pytest
+
+from open_mpic_core import DomainTreeWalker
+
+
+# noinspection PyMethodMayBeStatic
+class TestDomainTreeWalker:
+    @pytest.mark.parametrize(
+        "answering_names, expected_found_at",
+        [
+            ({"sub3.sub2.sub1.example.com."}, "sub3.sub2.sub1.example.com."),  # the domain itself
+            ({"sub1.example.com.", "com."}, "sub1.example.com."),  # most specific ancestor, though answered last
+            (set(), "."),  # no answer anywhere
+        ],
+    )
+    async def walk_speculatively__should_return_most_specific_answer_and_where_it_was_found(
+        self, answering_names, expected_found_at
+    ):
+        async def resolve(name):
+            # the closer to the root, the faster the answer, so that out-of-order completion is exercised
+            await asyncio.sleep(0.001 * len(name.labels))
+            if name.to_text() in answering_names:
+                return f"answer for {name}"
+            raise dns.resolver.NoAnswer
+
+        domain = dns.name.from_text("sub3.sub2.sub1.example.com")
+        answer, found_at = await DomainTreeWalker.walk_speculatively(domain, resolve)
+        assert found_at.to_text() == expected_found_at
+        assert answer == (f"answer for {found_at}" if answering_names else None)
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from open_mpic_core import InflightLookups
+
+
+# noinspection PyMethodMayBeStatic
+class TestInflightLookups:
+    async def run__should_share_single_lookup_across_concurrent_callers_with_same_key(self):
+        inflight_lookups = InflightLookups()
+        lookup_count = 0
+
+        async def lookup():
+            nonlocal lookup_count
+            lookup_count += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*[inflight_lookups.run("key", lookup) for _ in range(3)])
+        assert results == ["result"] * 3
+        assert lookup_count == 1
+        assert len(inflight_lookups) == 0
+
+    async def run__should_run_separate_lookups_for_different_keys(self):
+        inflight_lookups = InflightLookups()
+
+        async def lookup(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            inflight_lookups.run("a", lambda: lookup("a")), inflight_lookups.run("b", lambda: lookup("b"))
+        )
+        assert results == ["a", "b"]
+
+    async def run__should_raise_lookup_error_for_every_caller(self):
+        inflight_lookups = InflightLookups()
+
+        async def lookup():
+            await asyncio.sleep(0.01)
+            raise ValueError("lookup failed")
+
+        results = await asyncio.gather(*[inflight_lookups.run("key", lookup) for _ in range(2)], return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(inflight_lookups) == 0
+
+    async def run__should_keep_lookup_going_for_other_callers_given_first_caller_cancelled(self):
+        inflight_lookups = InflightLookups()
+
+        async def lookup():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        first_caller = asyncio.create_task(inflight_lookups.run("key", lookup))
+        await asyncio.sleep(0)
+        second_caller = asyncio.create_task(inflight_lookups.run("key", lookup))
+        await asyncio.sleep(0)
+        first_caller.cancel()
+        assert await second_caller == "result"
+        with pytest.raises(asyncio.CancelledError):
+            await first_caller
+
+    async def run__should_cancel_lookup_given_all_callers_cancelled(self):
+        inflight_lookups = InflightLookups()
+        lookup_cancelled = asyncio.Event()
+
+        async def lookup():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                lookup_cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(inflight_lookups.run("key", lookup)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(lookup_cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)  # let the lookup's done callback run
+        assert len(inflight_lookups) == 0
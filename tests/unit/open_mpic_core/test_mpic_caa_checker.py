@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from io import StringIO
 
@@ -77,6 +78,18 @@ class TestMpicCaaChecker:
         assert caa_checker.resolver.timeout == expected_timeout
         assert caa_checker.resolver.lifetime == expected_lifetime
 
+    @pytest.mark.parametrize("dns_cache_size, expect_cache", [(0, False), (1024, True)])
+    def constructor__should_give_each_checker_its_own_resolver_caching_only_if_requested(
+        self, dns_cache_size, expect_cache
+    ):
+        caa_checker_1 = MpicCaaChecker(
+            default_caa_domain_list=["ca1.com"], dns_timeout=10, dns_cache_size=dns_cache_size
+        )
+        caa_checker_2 = MpicCaaChecker(default_caa_domain_list=["ca1.com"], dns_timeout=20)
+        assert caa_checker_1.resolver is not caa_checker_2.resolver
+        assert caa_checker_1.resolver.timeout == 10
+        assert isinstance(caa_checker_1.resolver.cache, dns.resolver.LRUCache) is expect_cache
+
     def mpic_caa_checker__should_be_able_to_log_at_trace_level(self):
         caa_checker = TestMpicCaaChecker.create_configured_caa_checker(TRACE_LEVEL)
         test_message = "This is a trace log message."
@@ -131,6 +144,17 @@ class TestMpicCaaChecker:
         )
         assert caa_response == expected_response
 
+    @pytest.mark.parametrize("configured_caa_domain", ["CA111.com", "ca111.COM"])
+    async def check_caa__should_match_caa_domains_case_insensitively(self, configured_caa_domain, mocker):
+        caa_checker = TestMpicCaaChecker.create_configured_caa_checker()
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca111.com", mocker
+        )
+        self.patch_resolver_with_answer_or_exception(mocker, caa_checker.resolver, test_dns_query_answer)
+        caa_request = self.create_caa_check_request("example.com", [configured_caa_domain])
+        caa_response = await caa_checker.check_caa(caa_request)
+        assert caa_response.check_passed is True
+
     async def check_caa__should_allow_smime_issuance_given_matching_caa_issuemail_record_found(self, mocker):
         caa_checker = TestMpicCaaChecker.create_configured_caa_checker()
         resolver = caa_checker.resolver
@@ -436,6 +460,203 @@ class TestMpicCaaChecker:
         assert caa_response.check_passed is True
         assert caa_response.details.records_seen == [f'0 issue "ca1.com"', f'0 {property_tag} "{property_value}"']
 
+    async def check_caa__should_serve_repeated_lookup_from_cache_given_cache_enabled_and_ttl_not_expired(self, mocker):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], caa_cache_size=10)
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+        test_dns_query_answer.rrset.ttl = 300
+        mock_resolve = self.patch_resolver_with_answer_or_exception(mocker, caa_checker.resolver, test_dns_query_answer)
+        for _ in range(3):
+            caa_response = await caa_checker.check_caa(self.create_caa_check_request("example.com", None))
+            assert caa_response.check_passed is True
+            assert caa_response.details.found_at == "example.com"
+        assert mock_resolve.await_count == 1
+
+    @pytest.mark.parametrize("caa_cache_size, ttl", [(0, 300), (10, 0)])
+    async def check_caa__should_not_cache_lookup_given_cache_disabled_or_zero_ttl(self, caa_cache_size, ttl, mocker):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], caa_cache_size=caa_cache_size)
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+        test_dns_query_answer.rrset.ttl = ttl
+        mock_resolve = self.patch_resolver_with_answer_or_exception(mocker, caa_checker.resolver, test_dns_query_answer)
+        for _ in range(2):
+            await caa_checker.check_caa(self.create_caa_check_request("example.com", None))
+        assert mock_resolve.await_count == 2
+
+    async def check_caa__should_look_up_again_once_cached_ttl_expires(self, mocker):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], caa_cache_size=10)
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+        test_dns_query_answer.rrset.ttl = 300
+        mock_resolve = self.patch_resolver_with_answer_or_exception(mocker, caa_checker.resolver, test_dns_query_answer)
+        await caa_checker.check_caa(self.create_caa_check_request("example.com", None))
+        # noinspection PyProtectedMember
+        rrset, domain, expiry = caa_checker._caa_cache["example.com"]
+        caa_checker._caa_cache["example.com"] = (rrset, domain, expiry - 300)  # as if the TTL has now run out
+        await caa_checker.check_caa(self.create_caa_check_request("example.com", None))
+        assert mock_resolve.await_count == 2
+
+    async def check_caa__should_evict_least_recently_used_lookup_given_cache_full(self, mocker):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], caa_cache_size=1)
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+        test_dns_query_answer.rrset.ttl = 300
+        mock_resolve = self.patch_resolver_with_answer_or_exception(mocker, caa_checker.resolver, test_dns_query_answer)
+        for target in ["example.com", "example.org", "example.com"]:
+            await caa_checker.check_caa(self.create_caa_check_request(target, None))
+        assert mock_resolve.await_count == 3
+
+    async def check_caa__should_share_single_dns_lookup_across_concurrent_checks_for_same_target(self, mocker):
+        caa_checker = TestMpicCaaChecker.create_configured_caa_checker()
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            await asyncio.sleep(0.01)  # keep the lookup in flight long enough for the other checks to join it
+            return test_dns_query_answer
+
+        mock_resolve = self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+        caa_requests = [self.create_caa_check_request("example.com", None) for _ in range(5)]
+        caa_responses = await asyncio.gather(*[caa_checker.check_caa(caa_request) for caa_request in caa_requests])
+        assert all(caa_response.check_passed is True for caa_response in caa_responses)
+        assert mock_resolve.await_count == 1
+        # noinspection PyProtectedMember
+        assert len(caa_checker._inflight_caa_lookups) == 0
+
+    async def check_caa__should_complete_concurrent_checks_for_same_target_given_first_caller_cancelled(self, mocker):
+        caa_checker = TestMpicCaaChecker.create_configured_caa_checker()
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            await asyncio.sleep(0.01)
+            return test_dns_query_answer
+
+        mock_resolve = self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+        first_check = asyncio.create_task(caa_checker.check_caa(self.create_caa_check_request("example.com", None)))
+        await asyncio.sleep(0)  # let the first check start the lookup
+        second_check = asyncio.create_task(caa_checker.check_caa(self.create_caa_check_request("example.com", None)))
+        await asyncio.sleep(0)  # let the second check join it
+        first_check.cancel()
+        caa_response = await second_check
+        assert first_check.cancelled() is True
+        assert caa_response.check_passed is True
+        assert mock_resolve.await_count == 1
+
+    async def check_caa__should_share_lookup_error_across_concurrent_checks_for_same_target(self, mocker):
+        caa_checker = TestMpicCaaChecker.create_configured_caa_checker()
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            await asyncio.sleep(0.01)
+            raise dns.resolver.NoNameservers()
+
+        mock_resolve = self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+        caa_requests = [self.create_caa_check_request("example.com", None) for _ in range(3)]
+        caa_responses = await asyncio.gather(*[caa_checker.check_caa(caa_request) for caa_request in caa_requests])
+        assert all(
+            caa_response.errors[0].error_type == ErrorMessages.CAA_LOOKUP_ERROR.key for caa_response in caa_responses
+        )
+        assert mock_resolve.await_count == 1
+        # noinspection PyProtectedMember
+        assert len(caa_checker._inflight_caa_lookups) == 0
+
+    async def check_caa__should_not_exceed_max_concurrent_dns_queries(self, mocker):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], max_concurrent_dns_queries=2)
+        queries_in_flight = 0
+        max_queries_in_flight = 0
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            nonlocal queries_in_flight, max_queries_in_flight
+            queries_in_flight += 1
+            max_queries_in_flight = max(max_queries_in_flight, queries_in_flight)
+            await asyncio.sleep(0.01)
+            queries_in_flight -= 1
+            raise dns.resolver.NoAnswer()
+
+        self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+        caa_requests = [self.create_caa_check_request(f"example{i}.com", None) for i in range(6)]
+        await asyncio.gather(*[caa_checker.check_caa(caa_request) for caa_request in caa_requests])
+        assert max_queries_in_flight == 2
+
+    def check_caa__should_bound_concurrent_dns_queries_across_separate_event_loops(self, mocker):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], max_concurrent_dns_queries=1)
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            await asyncio.sleep(0.001)  # so that the checks contend for the semaphore
+            raise dns.resolver.NoAnswer()
+
+        self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+
+        async def check_caa_concurrently():
+            caa_requests = [self.create_caa_check_request(f"example{i}.com", None) for i in range(3)]
+            return await asyncio.gather(*[caa_checker.check_caa(caa_request) for caa_request in caa_requests])
+
+        for _ in range(2):  # e.g., one asyncio.run() per serverless invocation
+            caa_responses = asyncio.run(check_caa_concurrently())
+            assert all(caa_response.check_passed is True for caa_response in caa_responses)
+            assert all(caa_response.errors is None for caa_response in caa_responses)
+
+    # fmt: off
+    @pytest.mark.parametrize("target_domain, caa_record_domain, expected_found_at", [
+        ("a.b.c.example.com", "a.b.c.example.com.", "a.b.c.example.com"),
+        ("a.b.c.example.com", "c.example.com.", "c.example.com"),
+        ("a.b.c.example.com", "example.com.", "example.com"),
+        ("a.b.c.example.com", "nowhere.example.org.", None),
+    ])
+    # fmt: on
+    async def check_caa__should_find_same_most_specific_caa_records_with_speculative_parent_lookups(
+        self, target_domain, caa_record_domain, expected_found_at, mocker
+    ):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], speculative_parent_lookups=True)
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            caa_record_domain.rstrip("."), 0, "issue", "ca1.com", mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            # the closer to the root, the faster the answer, so that out-of-order completion is exercised
+            await asyncio.sleep(0.001 * len(domain.labels))
+            if domain.to_text() == caa_record_domain:
+                return test_dns_query_answer
+            raise dns.resolver.NXDOMAIN if len(domain.labels) > 4 else dns.resolver.NoAnswer
+
+        self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+        caa_response = await caa_checker.check_caa(self.create_caa_check_request(target_domain, None))
+        assert caa_response.check_passed is True
+        assert caa_response.details.found_at == expected_found_at
+
+    async def check_caa__should_raise_lookup_error_from_most_specific_failed_ancestor_with_speculative_lookups(
+        self, mocker
+    ):
+        caa_checker = MpicCaaChecker(default_caa_domain_list=["ca1.com"], speculative_parent_lookups=True)
+        test_dns_query_answer = MockDnsObjectCreator.create_caa_query_answer(
+            "example.com", 0, "issue", "ca1.com", mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(domain, rdtype):
+            if domain.to_text() == "example.com.":
+                return test_dns_query_answer
+            if domain.to_text() == "sub.example.com.":
+                raise dns.resolver.LifetimeTimeout(timeout=5.0, errors=[])
+            raise dns.resolver.NoAnswer
+
+        self.patch_resolver_resolve_with_side_effect(mocker, caa_checker.resolver, side_effect)
+        caa_response = await caa_checker.check_caa(self.create_caa_check_request("deeper.sub.example.com", None))
+        assert caa_response.check_completed is False
+        assert caa_response.errors[0].error_type == ErrorMessages.CAA_LOOKUP_ERROR.key
+
     async def check_caa__should_be_able_to_trace_timing_of_caa_lookup(self, mocker):
         caa_checker = TestMpicCaaChecker.create_configured_caa_checker(TRACE_LEVEL)  # note the TRACE_LEVEL here
         resolver = caa_checker.resolver
@@ -680,6 +901,17 @@ class TestMpicCaaChecker:
         )
         assert result is False
 
+    def is_valid_for_issuance__should_be_false_given_critical_flag_for_an_unknown_tag_after_matching_issue_tag(self):
+        records = [
+            MockDnsObjectCreator.create_caa_record(0, "issue", "ca1.org"),
+            MockDnsObjectCreator.create_caa_record(128, "mystery", "ca1.org"),
+        ]
+        test_rrset = MockDnsObjectCreator.create_rrset(dns.rdatatype.CAA, *records)
+        result = MpicCaaChecker.is_valid_for_issuance(
+            caa_domains=["ca1.org"], certificate_type=CertificateType.TLS_SERVER, is_wc_domain=False, rrset=test_rrset
+        )
+        assert result is False
+
     def is_valid_for_issuance__should_be_false_given_issuewild_disallowed_for_all_and_wildcard_domain(self):
         records = [
             MockDnsObjectCreator.create_caa_record(0, "issue", "ca1.org"),
@@ -3,6 +3,7 @@ import pydantic
 import pytest
 from open_mpic_core import CheckType
 from open_mpic_core import MpicCaaRequest
+from open_mpic_core import MPIC_REQUEST_ADAPTER
 
 from unit.test_util.valid_mpic_request_creator import ValidMpicRequestCreator
 
@@ -18,6 +19,12 @@ class TestMpicCaaRequest:
         mpic_request = MpicCaaRequest.model_validate_json(json.dumps(request.model_dump(warnings=False)))
         assert mpic_request.domain_or_ip_target == request.domain_or_ip_target
 
+    def mpic_request_adapter__should_return_caa_mpic_request_given_valid_caa_json(self):
+        request = ValidMpicRequestCreator.create_valid_caa_mpic_request()
+        mpic_request = MPIC_REQUEST_ADAPTER.validate_json(json.dumps(request.model_dump(warnings=False)))
+        assert isinstance(mpic_request, MpicCaaRequest)
+        assert mpic_request == request
+
     def mpic_caa_request__should_require_domain_or_ip_target(self):
         request = ValidMpicRequestCreator.create_valid_caa_mpic_request()
         # noinspection PyTypeChecker
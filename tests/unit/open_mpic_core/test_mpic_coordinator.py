@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from io import StringIO
 from itertools import cycle
@@ -12,6 +13,7 @@ from open_mpic_core import (
     CaaCheckResponse,
     CaaCheckResponseDetails,
     CohortCreationException,
+    CohortCreator,
     CohortSelectionException,
     MpicRequestOrchestrationParameters,
     RemotePerspective,
@@ -91,6 +93,32 @@ class TestMpicCoordinator:
         cohorts = mpic_coordinator.shuffle_and_group_perspectives(target_perspectives, cohort_size, "test_target")
         assert len(cohorts) == 2
 
+    def shuffle_and_group_perspectives__should_reuse_cohorts_for_repeated_target_and_cohort_size(self, mocker):
+        coordinator_config = self.create_mpic_coordinator_configuration()
+        target_perspectives = coordinator_config.target_perspectives
+        mpic_coordinator = MpicCoordinator(self.create_passing_caa_check_response, coordinator_config)
+        create_cohorts_spy = mocker.spy(CohortCreator, "create_perspective_cohorts")
+        first_cohorts = mpic_coordinator.shuffle_and_group_perspectives(target_perspectives, 3, "Test_Target")
+        first_cohorts[0].clear()  # callers altering the returned cohorts should not affect later calls
+        second_cohorts = mpic_coordinator.shuffle_and_group_perspectives(target_perspectives, 3, "test_target")
+        mpic_coordinator.shuffle_and_group_perspectives(target_perspectives, 2, "test_target")
+        assert create_cohorts_spy.call_count == 2
+        assert len(second_cohorts) == 2 and all(len(cohort) == 3 for cohort in second_cohorts)
+
+    def shuffle_and_group_perspectives__should_return_same_cohorts_whether_or_not_cached(self):
+        coordinator_config = self.create_mpic_coordinator_configuration()
+        target_perspectives = coordinator_config.target_perspectives
+        caching_coordinator = MpicCoordinator(self.create_passing_caa_check_response, coordinator_config)
+        non_caching_coordinator = MpicCoordinator(
+            self.create_passing_caa_check_response, coordinator_config, cohort_cache_size=0
+        )
+        for _ in range(2):
+            cached_cohorts = caching_coordinator.shuffle_and_group_perspectives(target_perspectives, 2, "test_target")
+            fresh_cohorts = non_caching_coordinator.shuffle_and_group_perspectives(
+                target_perspectives, 2, "test_target"
+            )
+            assert cached_cohorts == fresh_cohorts
+
     @pytest.mark.parametrize("domain", ["bücher.example.de", "café.com"])
     async def shuffle_and_group_perspectives__should_handle_domains_with_non_ascii_chars(self, domain):
         coordinator_config = self.create_mpic_coordinator_configuration()
@@ -419,6 +447,72 @@ class TestMpicCoordinator:
             assert len(perspective_result_list) == 2
             assert all(not perspective.check_response.check_passed for perspective in perspective_result_list)
 
+    async def coordinate_mpic__should_stop_waiting_on_remaining_perspectives_once_quorum_met_if_configured(self):
+        mpic_coordinator_config = self.create_mpic_coordinator_configuration()
+        mpic_request = ValidMpicRequestCreator.create_valid_caa_mpic_request()
+        mpic_request.orchestration_parameters = MpicRequestOrchestrationParameters(quorum_count=1, perspective_count=2)
+        calls_made = 0
+
+        async def pass_first_call_and_hang_on_second(perspective, check_type, check_request):
+            nonlocal calls_made
+            calls_made += 1
+            if calls_made > 1:
+                await asyncio.Event().wait()  # never completes; must be cancelled by the coordinator
+            return self.create_passing_caa_check_response(perspective, check_type, check_request)
+
+        mpic_coordinator = MpicCoordinator(
+            pass_first_call_and_hang_on_second, mpic_coordinator_config, return_early_on_quorum=True
+        )
+        mpic_response = await asyncio.wait_for(mpic_coordinator.coordinate_mpic(mpic_request), timeout=1)
+        assert mpic_response.is_valid is True
+        assert mpic_response.mpic_completed is True
+        assert len(mpic_response.perspectives) == 2
+        cut_off_response = next(p for p in mpic_response.perspectives if p.check_response.check_passed is False)
+        assert cut_off_response.check_response.errors[0].error_type == ErrorMessages.COORDINATOR_REMOTE_CHECK_ERROR.key
+
+    async def coordinate_mpic__should_treat_remote_call_cancelled_from_within_as_failed_perspective_if_early_return(
+        self,
+    ):
+        mpic_coordinator_config = self.create_mpic_coordinator_configuration()
+        mpic_request = ValidMpicRequestCreator.create_valid_caa_mpic_request()
+        mpic_request.orchestration_parameters = MpicRequestOrchestrationParameters(quorum_count=1, perspective_count=2)
+        calls_made = 0
+
+        async def cancel_first_call_and_pass_second(perspective, check_type, check_request):
+            nonlocal calls_made
+            calls_made += 1
+            if calls_made == 1:
+                raise asyncio.CancelledError()  # e.g., a remote call that cancels itself on timing out
+            await asyncio.sleep(0.01)  # complete after the cancelled call
+            return self.create_passing_caa_check_response(perspective, check_type, check_request)
+
+        mpic_coordinator = MpicCoordinator(
+            cancel_first_call_and_pass_second, mpic_coordinator_config, return_early_on_quorum=True
+        )
+        mpic_response = await asyncio.wait_for(mpic_coordinator.coordinate_mpic(mpic_request), timeout=1)
+        assert mpic_response.is_valid is True
+        assert len(mpic_response.perspectives) == 2
+        cancelled_response = next(p for p in mpic_response.perspectives if p.check_response.check_passed is False)
+        assert (
+            cancelled_response.check_response.errors[0].error_type == ErrorMessages.COORDINATOR_REMOTE_CHECK_ERROR.key
+        )
+
+    async def coordinate_mpic__should_wait_on_all_perspectives_if_quorum_never_met_even_if_early_return_configured(
+        self,
+    ):
+        mpic_coordinator_config = self.create_mpic_coordinator_configuration()
+        mpic_request = ValidMpicRequestCreator.create_valid_caa_mpic_request()
+        mocked_call_remote_perspective_function = AsyncMock()
+        mocked_call_remote_perspective_function.side_effect = TestMpicCoordinator.SideEffectForMockedPayloads(
+            self.create_failing_remote_caa_check_response
+        )
+        mpic_coordinator = MpicCoordinator(
+            mocked_call_remote_perspective_function, mpic_coordinator_config, return_early_on_quorum=True
+        )
+        mpic_response = await mpic_coordinator.coordinate_mpic(mpic_request)
+        assert mpic_response.is_valid is False
+        assert all(p.check_response.errors is None for p in mpic_response.perspectives)
+
     @pytest.mark.parametrize("check_type", [CheckType.CAA, CheckType.DCV])
     async def coordinate_mpic__should_allow_exceptions_in_failing_remotes_if_quorum_achieved_overall(self, check_type):
         mpic_request = None
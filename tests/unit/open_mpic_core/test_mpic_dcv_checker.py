@@ -1,5 +1,6 @@
 import asyncio
 import base64
+import gc
 import logging
 import time
 
@@ -34,14 +35,42 @@ from open_mpic_core import ExpectedDnsRecordContent
 from unit.test_util.mock_dns_object_creator import MockDnsObjectCreator
 from unit.test_util.valid_check_creator import ValidCheckCreator
 
+# rdata objects are immutable, so the non-matching filler records can be shared across tests
+NON_MATCHING_TXT_RECORDS = tuple(
+    MockDnsObjectCreator.create_record_by_type(DnsRecordType.TXT, {"value": value})
+    for value in ("whatever2", "whatever3")
+)
+
+
+class _MockHttpGetContextManager:
+    """
+    Stands in for the context manager returned by ClientSession.get, without AsyncMock overhead. Holds no state across
+    entries, so one instance can serve as the return_value for any number of calls.
+    """
+
+    __slots__ = ("response", "error")
+
+    def __init__(self, response: ClientResponse | None = None, error: Exception | None = None):
+        self.response = response
+        self.error = error
+
+    async def __aenter__(self):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    async def __aexit__(self, *exc_info):
+        return False
+
 
 # noinspection PyMethodMayBeStatic
 class TestMpicDcvChecker:
     # noinspection PyAttributeOutsideInit
     @pytest.fixture(autouse=True)
-    def setup_dcv_checker(self):
+    async def setup_dcv_checker(self):
         self.dcv_checker = MpicDcvChecker()
         yield self.dcv_checker
+        await self.dcv_checker.close_async_http_client()
 
     @pytest.fixture(autouse=True)
     def setup_logging(self):
@@ -77,6 +106,102 @@ class TestMpicDcvChecker:
         assert dcv_checker.resolver.timeout == expected_timeout
         assert dcv_checker.resolver.lifetime == expected_lifetime
 
+    @pytest.mark.parametrize("dns_cache_size, expect_cache", [(0, False), (1024, True)])
+    def constructor__should_give_each_checker_its_own_resolver_caching_only_if_requested(
+        self, dns_cache_size, expect_cache
+    ):
+        dcv_checker = MpicDcvChecker(dns_cache_size=dns_cache_size)
+        assert dcv_checker.resolver is not MpicDcvChecker().resolver
+        assert isinstance(dcv_checker.resolver.cache, dns.resolver.LRUCache) is expect_cache
+
+    def constructor__should_set_up_one_resolver_per_nameserver_to_race_if_provided(self):
+        dcv_checker = MpicDcvChecker(
+            dns_timeout=1, dns_cache_size=16, dns_race_nameservers=["192.0.2.1", "192.0.2.2", "192.0.2.3"]
+        )
+        assert dcv_checker.dns_resolvers[0] is dcv_checker.resolver
+        assert [resolver.nameservers for resolver in dcv_checker.dns_resolvers] == [
+            ["192.0.2.1"],
+            ["192.0.2.2"],
+            ["192.0.2.3"],
+        ]
+        assert all(resolver.timeout == 1 for resolver in dcv_checker.dns_resolvers)
+        assert all(resolver.cache is dcv_checker.resolver.cache for resolver in dcv_checker.dns_resolvers)
+
+    async def get_async_http_client__should_configure_connector_with_connection_limit_and_dns_cache(self):
+        dcv_checker = MpicDcvChecker(http_connection_limit=50, http_dns_cache_ttl=60)
+        async with dcv_checker.get_async_http_client() as client:
+            assert client.connector.limit == 50
+            assert client.connector.limit_per_host == 0
+            assert client.connector.use_dns_cache is True
+        await dcv_checker.close_async_http_client()
+
+    @pytest.mark.parametrize("http_keepalive_timeout, expect_force_close", [(None, True), (30, False)])
+    async def get_async_http_client__should_keep_connections_alive_only_if_configured(
+        self, http_keepalive_timeout, expect_force_close
+    ):
+        dcv_checker = MpicDcvChecker(share_http_client=True, http_keepalive_timeout=http_keepalive_timeout)
+        async with dcv_checker.get_async_http_client() as client:
+            assert client.connector.force_close is expect_force_close
+        await dcv_checker.close_async_http_client()
+
+    async def get_async_http_client__should_give_each_check_its_own_client_closed_afterward_by_default(self):
+        async with self.dcv_checker.get_async_http_client() as first_client:
+            assert not first_client.closed
+        assert first_client.closed
+        async with self.dcv_checker.get_async_http_client() as second_client:
+            assert second_client is not first_client
+
+    async def get_async_http_client__should_share_one_client_across_checks_until_closed_if_configured(self):
+        dcv_checker = MpicDcvChecker(share_http_client=True)
+        async with dcv_checker.get_async_http_client() as first_client:
+            pass
+        async with dcv_checker.get_async_http_client() as second_client:
+            assert second_client is first_client
+            assert not second_client.closed
+        await dcv_checker.close_async_http_client()
+        assert first_client.closed
+        async with dcv_checker.get_async_http_client() as third_client:
+            assert third_client is not first_client
+        await dcv_checker.close_async_http_client()
+
+    def get_async_http_client__should_replace_shared_client_without_leaking_it_given_different_event_loop(self):
+        dcv_checker = MpicDcvChecker(share_http_client=True)
+
+        async def get_client(close_afterward):
+            async with dcv_checker.get_async_http_client() as client:
+                pass
+            if close_afterward:
+                await dcv_checker.close_async_http_client()
+            return client
+
+        first_client = asyncio.run(get_client(close_afterward=False))  # left open as its loop ends
+        second_client = asyncio.run(get_client(close_afterward=True))
+        assert second_client is not first_client
+        assert first_client.connector is None  # released along with its (closed) loop
+        del first_client, second_client, dcv_checker
+        gc.collect()
+        assert "Unclosed client session" not in self.log_output.getvalue()
+
+    def get_async_http_client__should_close_shared_client_given_its_event_loop_stopped_but_not_closed(self):
+        dcv_checker = MpicDcvChecker(share_http_client=True)
+
+        async def get_client(close_afterward):
+            async with dcv_checker.get_async_http_client() as client:
+                pass
+            if close_afterward:
+                await dcv_checker.close_async_http_client()
+            return client
+
+        stopped_loop = asyncio.new_event_loop()
+        try:
+            first_client = stopped_loop.run_until_complete(get_client(close_afterward=False))
+            second_client = asyncio.run(get_client(close_afterward=True))
+            assert second_client is not first_client
+            assert first_client.closed
+        finally:
+            stopped_loop.close()
+        assert "Failed to close stale HTTP client" not in self.log_output.getvalue()
+
     def mpic_dcv_checker__should_be_able_to_log_at_trace_level(self):
         dcv_checker = MpicDcvChecker(log_level=TRACE_LEVEL)
         test_message = "This is a trace log message."
@@ -293,6 +418,7 @@ class TestMpicDcvChecker:
     @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.ACME_HTTP_01, DcvValidationMethod.ACME_DNS_01])
     async def check_dcv__should_be_able_to_trace_timing_of_http_and_dns_lookups(self, dcv_method, mocker):
         tracing_dcv_checker = MpicDcvChecker(log_level=TRACE_LEVEL)
+        self.dcv_checker = tracing_dcv_checker  # so that the mocks below are applied to this checker's resolver
 
         if dcv_method == DcvValidationMethod.ACME_HTTP_01:
             dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
@@ -455,13 +581,24 @@ class TestMpicDcvChecker:
 
     async def http_based_dcv_checks__should_read_more_than_100_bytes_if_challenge_value_requires_it(self, mocker):
         dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.WEBSITE_CHANGE)
-        dcv_request.dcv_check_parameters.challenge_value = "".join(["a"] * 150)  # 150 'a' characters
+        dcv_request.dcv_check_parameters.challenge_value = "a" * 150
         mock_response = TestMpicDcvChecker._create_mock_http_response_with_content_and_encoding(b"a" * 1000, "utf-8")
         self._mock_request_agnostic_http_response(mock_response, mocker)
         dcv_response = await self.dcv_checker.check_dcv(dcv_request)
         hundred_fifty_a_chars_b64 = base64.b64encode(b"a" * 150).decode()  # store 150 chars in base64 encoded string
         assert len(dcv_response.details.response_page) == len(hundred_fifty_a_chars_b64)
 
+    @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.WEBSITE_CHANGE, DcvValidationMethod.ACME_HTTP_01])
+    async def http_based_dcv_checks__should_omit_response_page_if_configured_not_to_include_it(
+        self, dcv_method, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(include_http_response_page=False)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
+        self._mock_request_specific_http_response(dcv_request, mocker)
+        dcv_response = await self.dcv_checker.check_dcv(dcv_request)
+        assert dcv_response.check_passed is True
+        assert dcv_response.details.response_page is None
+
     @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.WEBSITE_CHANGE, DcvValidationMethod.ACME_HTTP_01])
     async def http_based_dcv_checks__should_leverage_requests_decoding_capabilities(self, dcv_method, mocker):
         # Expected to be received in the Content-Type header.
@@ -481,6 +618,20 @@ class TestMpicDcvChecker:
         dcv_response = await self.dcv_checker.check_dcv(dcv_request)
         assert dcv_response.check_passed is True
 
+    @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.WEBSITE_CHANGE, DcvValidationMethod.ACME_HTTP_01])
+    async def http_based_dcv_checks__should_decode_as_utf8_given_unknown_charset(self, dcv_method, mocker):
+        content = "Café".encode("utf-8")
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
+        mock_response = TestMpicDcvChecker._create_mock_http_response_with_content_and_encoding(content, "bogus")
+        self._mock_request_agnostic_http_response(mock_response, mocker)
+        match dcv_method:
+            case DcvValidationMethod.WEBSITE_CHANGE:
+                dcv_request.dcv_check_parameters.challenge_value = "Café"
+            case DcvValidationMethod.ACME_HTTP_01:
+                dcv_request.dcv_check_parameters.key_authorization = "Café"
+        dcv_response = await self.dcv_checker.check_dcv(dcv_request)
+        assert dcv_response.check_passed is True
+
     @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.WEBSITE_CHANGE, DcvValidationMethod.ACME_HTTP_01])
     async def http_based_dcv_checks__should_utilize_http_headers_if_provided_in_request(self, dcv_method, mocker):
         dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
@@ -494,6 +645,45 @@ class TestMpicDcvChecker:
 
         assert requests_get_mock.call_args.kwargs["headers"] == headers
 
+    @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.WEBSITE_CHANGE, DcvValidationMethod.ACME_HTTP_01])
+    async def http_based_dcv_checks__should_request_only_bytes_to_read_if_range_requests_enabled(
+        self, dcv_method, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(http_range_requests=True)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
+        headers = {"X-Test-Header": "test-value"}
+        dcv_request.dcv_check_parameters.http_headers = headers
+        requests_get_mock = self._mock_request_specific_http_response(dcv_request, mocker)
+        dcv_response = await self.dcv_checker.check_dcv(dcv_request)
+        assert dcv_response.check_passed is True
+        assert requests_get_mock.call_args.kwargs["headers"] == {**headers, "Range": "bytes=0-99"}
+        assert dcv_request.dcv_check_parameters.http_headers == headers  # request itself is left as is
+
+    async def http_based_dcv_checks__should_not_override_range_header_provided_in_request(self, mocker):
+        self.dcv_checker = MpicDcvChecker(http_range_requests=True)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.WEBSITE_CHANGE)
+        headers = {"range": "bytes=0-499"}
+        dcv_request.dcv_check_parameters.http_headers = headers
+        requests_get_mock = self._mock_request_specific_http_response(dcv_request, mocker)
+        await self.dcv_checker.check_dcv(dcv_request)
+        assert requests_get_mock.call_args.kwargs["headers"] == headers
+
+    @pytest.mark.parametrize("http_range_requests, expected_result", [(True, True), (False, False)])
+    async def http_based_dcv_checks__should_accept_partial_content_response_only_if_range_requests_enabled(
+        self, http_range_requests, expected_result, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(http_range_requests=http_range_requests)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.ACME_HTTP_01)
+        partial_response = TestMpicDcvChecker._create_mock_http_response(
+            206, dcv_request.dcv_check_parameters.key_authorization, {"reason": "Partial Content"}
+        )
+        mocker.patch(
+            "aiohttp.ClientSession.get",
+            return_value=_MockHttpGetContextManager(partial_response),
+        )
+        dcv_response = await self.dcv_checker.check_dcv(dcv_request)
+        assert dcv_response.check_passed is expected_result
+
     # fmt: off
     @pytest.mark.parametrize("dcv_method, code_or_port", [
         (DcvValidationMethod.WEBSITE_CHANGE, "unacceptable_code"),
@@ -540,7 +730,7 @@ class TestMpicDcvChecker:
         success_response = TestMpicDcvChecker._create_mock_http_response(200, expected_challenge)
         mock_get = mocker.patch(
             "aiohttp.ClientSession.get",
-            side_effect=lambda *args, **kwargs: AsyncMock(__aenter__=AsyncMock(return_value=success_response)),
+            return_value=_MockHttpGetContextManager(success_response),
         )
 
         dcv_response = await self.dcv_checker.check_dcv(dcv_request)
@@ -562,7 +752,7 @@ class TestMpicDcvChecker:
         success_response = TestMpicDcvChecker._create_mock_http_response(200, expected_challenge)
         mock_get = mocker.patch(
             "aiohttp.ClientSession.get",
-            side_effect=lambda *args, **kwargs: AsyncMock(__aenter__=AsyncMock(return_value=success_response)),
+            return_value=_MockHttpGetContextManager(success_response),
         )
 
         dcv_response = await self.dcv_checker.check_dcv(dcv_request)
@@ -571,6 +761,20 @@ class TestMpicDcvChecker:
         assert mock_get.call_args.kwargs["url"] == expected_url
         assert dcv_response.details.response_url == expected_url
 
+    def build_website_change_lookup__should_return_pki_token_url_and_challenge_value(self):
+        check_parameters = ValidCheckCreator.create_valid_http_check_request().dcv_check_parameters
+        check_parameters.url_scheme = UrlScheme.HTTPS
+        token_url, expected_content = MpicDcvChecker.build_website_change_lookup(check_parameters, "example.com")
+        token_path = check_parameters.http_token_path
+        assert token_url == f"https://example.com/{MpicDcvChecker.WELL_KNOWN_PKI_PATH}/{token_path}"
+        assert expected_content == check_parameters.challenge_value
+
+    def build_acme_http_01_lookup__should_return_acme_token_url_and_key_authorization(self):
+        check_parameters = ValidCheckCreator.create_valid_acme_http_01_check_request().dcv_check_parameters
+        token_url, expected_content = MpicDcvChecker.build_acme_http_01_lookup(check_parameters, "[::1]")
+        assert token_url == f"http://[::1]/{MpicDcvChecker.WELL_KNOWN_ACME_PATH}/{check_parameters.token}"
+        assert expected_content == check_parameters.key_authorization
+
     @pytest.mark.parametrize("url_scheme", [UrlScheme.HTTP, UrlScheme.HTTPS])
     async def website_change_validation__should_use_specified_url_scheme(self, url_scheme, mocker):
         dcv_request = ValidCheckCreator.create_valid_http_check_request()
@@ -608,6 +812,17 @@ class TestMpicDcvChecker:
         dcv_response = await self.dcv_checker.perform_http_based_validation(dcv_request)
         assert dcv_response.check_passed is False
 
+    async def website_change_validation__should_compile_repeated_match_regex_only_once(self, mocker):
+        MpicDcvChecker.compile_match_regex.cache_clear()
+        for _ in range(2):
+            dcv_request = ValidCheckCreator.create_valid_http_check_request()
+            dcv_request.dcv_check_parameters.match_regex = "^challenge_[0-9]*$"
+            self._mock_request_specific_http_response(dcv_request, mocker)
+            dcv_response = await self.dcv_checker.perform_http_based_validation(dcv_request)
+            assert dcv_response.check_passed is True
+        cache_info = MpicDcvChecker.compile_match_regex.cache_info()
+        assert (cache_info.misses, cache_info.hits) == (1, 1)
+
     async def website_change_validation__should_read_more_than_100_bytes_if_regex_requires_it(self, mocker):
         dcv_request = ValidCheckCreator.create_valid_http_check_request()
         dcv_request.dcv_check_parameters.challenge_value = (
@@ -720,6 +935,8 @@ class TestMpicDcvChecker:
         (DcvValidationMethod.CONTACT_EMAIL_CAA, "contactemail", True),
         (DcvValidationMethod.CONTACT_PHONE_CAA, "issue", False),
         (DcvValidationMethod.CONTACT_PHONE_CAA, "contactphone", True),
+        (DcvValidationMethod.CONTACT_EMAIL_CAA, "ContactEmail", True),
+        (DcvValidationMethod.CONTACT_PHONE_CAA, "CONTACTPHONE", True),
     ])
     # fmt: on
     async def contact_info_caa_lookup__should_not_pass_if_required_tag_not_found(
@@ -757,6 +974,92 @@ class TestMpicDcvChecker:
         dcv_response = await self.dcv_checker.perform_general_dns_validation(dcv_request)
         assert dcv_response.check_passed is False
 
+    @pytest.mark.parametrize(
+        "dcv_method", [DcvValidationMethod.CONTACT_EMAIL_CAA, DcvValidationMethod.CONTACT_PHONE_CAA]
+    )
+    async def contact_info_caa_lookup__should_find_most_specific_records_with_speculative_parent_lookups(
+        self, dcv_method, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(speculative_parent_lookups=True)
+        dcv_request = ValidCheckCreator.create_valid_contact_check_request(dcv_method)
+        tag = "contactphone" if dcv_method == DcvValidationMethod.CONTACT_PHONE_CAA else "contactemail"
+        record_data = {"flags": 0, "tag": tag, "value": dcv_request.dcv_check_parameters.challenge_value}
+        current_target = dcv_request.domain_or_ip_target
+        sub1_answer = MockDnsObjectCreator.create_dns_query_answer(
+            f"sub1.{current_target}", None, DnsRecordType.CAA, record_data, mocker
+        )
+        target_answer = MockDnsObjectCreator.create_dns_query_answer(
+            current_target, None, DnsRecordType.CAA, record_data, mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(qname, rdtype):
+            # the closer to the root, the faster the answer, so that out-of-order completion is exercised
+            await asyncio.sleep(0.001 * len(qname.labels))
+            if qname.to_text() == f"sub1.{current_target}.":
+                return sub1_answer
+            if qname.to_text() == f"{current_target}.":
+                return target_answer
+            raise dns.resolver.NoAnswer
+
+        self.patch_resolver_resolve_with_side_effect(mocker, self.dcv_checker.resolver, side_effect)
+        dcv_request.domain_or_ip_target = f"sub3.sub2.sub1.{current_target}"
+        dcv_response = await self.dcv_checker.perform_general_dns_validation(dcv_request)
+        assert dcv_response.check_passed is True
+        assert dcv_response.details.found_at == f"sub1.{current_target}"
+
+    async def contact_info_caa_lookup__should_not_wait_for_less_specific_ancestors_once_records_found(self, mocker):
+        self.dcv_checker = MpicDcvChecker(speculative_parent_lookups=True)
+        dcv_request = ValidCheckCreator.create_valid_contact_check_request(DcvValidationMethod.CONTACT_EMAIL_CAA)
+        record_data = {"flags": 0, "tag": "contactemail", "value": dcv_request.dcv_check_parameters.challenge_value}
+        current_target = dcv_request.domain_or_ip_target
+        sub1_answer = MockDnsObjectCreator.create_dns_query_answer(
+            f"sub1.{current_target}", None, DnsRecordType.CAA, record_data, mocker
+        )
+        cancelled_lookups = []
+
+        # noinspection PyUnusedLocal
+        async def side_effect(qname, rdtype):
+            if qname.to_text() == f"sub1.{current_target}.":
+                return sub1_answer
+            if len(qname.labels) > len(sub1_answer.qname.labels):
+                raise dns.resolver.NoAnswer
+            try:
+                await asyncio.sleep(5)  # less specific ancestors are slow to answer
+            except asyncio.CancelledError:
+                cancelled_lookups.append(qname)
+                raise
+
+        self.patch_resolver_resolve_with_side_effect(mocker, self.dcv_checker.resolver, side_effect)
+        dcv_request.domain_or_ip_target = f"sub2.sub1.{current_target}"
+        start_time = time.perf_counter()
+        dcv_response = await self.dcv_checker.perform_general_dns_validation(dcv_request)
+        assert time.perf_counter() - start_time < 1
+        assert dcv_response.details.found_at == f"sub1.{current_target}"
+        assert len(cancelled_lookups) > 0
+
+    async def contact_info_caa_lookup__should_not_exceed_max_concurrent_dns_queries_with_speculative_lookups(
+        self, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(speculative_parent_lookups=True, max_concurrent_dns_queries=2)
+        dcv_request = ValidCheckCreator.create_valid_contact_check_request(DcvValidationMethod.CONTACT_EMAIL_CAA)
+        queries_in_flight = 0
+        max_queries_in_flight = 0
+
+        # noinspection PyUnusedLocal
+        async def side_effect(qname, rdtype):
+            nonlocal queries_in_flight, max_queries_in_flight
+            queries_in_flight += 1
+            max_queries_in_flight = max(max_queries_in_flight, queries_in_flight)
+            await asyncio.sleep(0.01)
+            queries_in_flight -= 1
+            raise dns.resolver.NoAnswer
+
+        self.patch_resolver_resolve_with_side_effect(mocker, self.dcv_checker.resolver, side_effect)
+        dcv_request.domain_or_ip_target = f"sub4.sub3.sub2.sub1.{dcv_request.domain_or_ip_target}"
+        await self.dcv_checker.perform_general_dns_validation(dcv_request)
+        assert max_queries_in_flight == 2
+
     @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.DNS_CHANGE, DcvValidationMethod.ACME_DNS_01])
     async def dns_based_dcv_checks__should_not_pass_given_non_matching_dns_record(self, dcv_method, mocker):
         dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
@@ -961,6 +1264,148 @@ class TestMpicDcvChecker:
         expected_records = [expected_value_1, "whatever2", "whatever3"]
         assert dcv_response.details.records_seen == expected_records
 
+    @pytest.mark.parametrize("dns_cache_size, expected_query_count", [(0, 3), (1024, 1)])
+    async def dns_based_dcv_checks__should_share_concurrent_identical_lookups_only_if_caching(
+        self, dns_cache_size, expected_query_count, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(dns_cache_size=dns_cache_size)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.DNS_CHANGE)
+        record_data = {"value": dcv_request.dcv_check_parameters.challenge_value}
+        test_dns_query_answer = MockDnsObjectCreator.create_dns_query_answer(
+            dcv_request.domain_or_ip_target, "", DnsRecordType.TXT, record_data, mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(qname, rdtype):
+            await asyncio.sleep(0.01)  # keep the lookup in flight long enough for the other checks to join it
+            return test_dns_query_answer
+
+        mock_resolve = self.patch_resolver_resolve_with_side_effect(mocker, self.dcv_checker.resolver, side_effect)
+        dcv_responses = await asyncio.gather(
+            *[self.dcv_checker.check_dcv(dcv_request.model_copy(deep=True)) for _ in range(3)]
+        )
+        assert all(dcv_response.check_passed is True for dcv_response in dcv_responses)
+        assert mock_resolve.await_count == expected_query_count
+        # noinspection PyProtectedMember
+        assert len(self.dcv_checker._inflight_dns_lookups) == 0
+
+    async def dns_based_dcv_checks__should_complete_concurrent_identical_lookups_given_first_caller_cancelled(
+        self, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(dns_cache_size=1024)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.DNS_CHANGE)
+        record_data = {"value": dcv_request.dcv_check_parameters.challenge_value}
+        test_dns_query_answer = MockDnsObjectCreator.create_dns_query_answer(
+            dcv_request.domain_or_ip_target, "", DnsRecordType.TXT, record_data, mocker
+        )
+
+        # noinspection PyUnusedLocal
+        async def side_effect(qname, rdtype):
+            await asyncio.sleep(0.01)
+            return test_dns_query_answer
+
+        mock_resolve = self.patch_resolver_resolve_with_side_effect(mocker, self.dcv_checker.resolver, side_effect)
+        first_check = asyncio.create_task(self.dcv_checker.check_dcv(dcv_request.model_copy(deep=True)))
+        await asyncio.sleep(0)  # let the first check start the lookup
+        second_check = asyncio.create_task(self.dcv_checker.check_dcv(dcv_request.model_copy(deep=True)))
+        await asyncio.sleep(0)  # let the second check join it
+        first_check.cancel()
+        dcv_response = await second_check
+        assert first_check.cancelled() is True
+        assert dcv_response.check_passed is True
+        assert mock_resolve.await_count == 1
+
+    async def dns_based_dcv_checks__should_use_first_answer_from_raced_nameservers_given_others_slow_or_failing(
+        self, mocker
+    ):
+        self.dcv_checker = MpicDcvChecker(dns_race_nameservers=["192.0.2.1", "192.0.2.2", "192.0.2.3"])
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.DNS_CHANGE)
+        record_data = {"value": dcv_request.dcv_check_parameters.challenge_value}
+        test_dns_query_answer = MockDnsObjectCreator.create_dns_query_answer(
+            dcv_request.domain_or_ip_target, "", DnsRecordType.TXT, record_data, mocker
+        )
+        slow_lookup_cancelled = asyncio.Event()
+
+        # noinspection PyUnusedLocal
+        async def failing_side_effect(qname, rdtype):
+            raise dns.exception.Timeout()
+
+        # noinspection PyUnusedLocal
+        async def slow_side_effect(qname, rdtype):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                slow_lookup_cancelled.set()
+                raise
+
+        # noinspection PyUnusedLocal
+        async def answering_side_effect(qname, rdtype):
+            await asyncio.sleep(0.01)  # answer after the first resolver has already failed
+            return test_dns_query_answer
+
+        failing_resolver, slow_resolver, answering_resolver = self.dcv_checker.dns_resolvers
+        self.patch_resolver_resolve_with_side_effect(mocker, failing_resolver, failing_side_effect)
+        self.patch_resolver_resolve_with_side_effect(mocker, slow_resolver, slow_side_effect)
+        self.patch_resolver_resolve_with_side_effect(mocker, answering_resolver, answering_side_effect)
+        dcv_response = await asyncio.wait_for(self.dcv_checker.check_dcv(dcv_request), timeout=1)
+        assert dcv_response.check_passed is True
+        assert slow_lookup_cancelled.is_set()
+
+    async def dns_based_dcv_checks__should_not_wait_on_other_raced_nameservers_given_nxdomain(self, mocker):
+        self.dcv_checker = MpicDcvChecker(dns_race_nameservers=["192.0.2.1", "192.0.2.2"])
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.DNS_CHANGE)
+
+        # noinspection PyUnusedLocal
+        async def nxdomain_side_effect(qname, rdtype):
+            raise dns.resolver.NXDOMAIN()
+
+        # noinspection PyUnusedLocal
+        async def slow_side_effect(qname, rdtype):
+            await asyncio.sleep(10)
+
+        nxdomain_resolver, slow_resolver = self.dcv_checker.dns_resolvers
+        self.patch_resolver_resolve_with_side_effect(mocker, nxdomain_resolver, nxdomain_side_effect)
+        self.patch_resolver_resolve_with_side_effect(mocker, slow_resolver, slow_side_effect)
+        dcv_response = await asyncio.wait_for(self.dcv_checker.check_dcv(dcv_request), timeout=1)
+        assert dcv_response.check_passed is False
+        assert dcv_response.check_completed is True
+        assert dcv_response.errors[0].error_type == ErrorMessages.DCV_LOOKUP_ERROR.key
+
+    async def dns_based_dcv_checks__should_return_error_given_all_raced_nameservers_failing(self, mocker):
+        self.dcv_checker = MpicDcvChecker(dns_race_nameservers=["192.0.2.1", "192.0.2.2"])
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(DcvValidationMethod.DNS_CHANGE)
+
+        timeout_error = dns.exception.Timeout()
+
+        # noinspection PyUnusedLocal
+        async def failing_side_effect(qname, rdtype):
+            raise timeout_error
+
+        for resolver in self.dcv_checker.dns_resolvers:
+            self.patch_resolver_resolve_with_side_effect(mocker, resolver, failing_side_effect)
+        dcv_response = await self.dcv_checker.check_dcv(dcv_request)
+        errors = [
+            MpicValidationError.create(
+                ErrorMessages.DCV_LOOKUP_ERROR, timeout_error.__class__.__name__, timeout_error.msg
+            )
+        ]
+        assert dcv_response.check_passed is False
+        assert dcv_response.check_completed is False
+        assert dcv_response.errors == errors
+
+    @pytest.mark.parametrize("dcv_method", [DcvValidationMethod.DNS_CHANGE, DcvValidationMethod.ACME_DNS_01])
+    async def dns_based_dcv_checks__should_stop_reading_records_at_first_match_if_configured(self, dcv_method, mocker):
+        self.dcv_checker = MpicDcvChecker(dns_stop_on_match=True)
+        dcv_request = ValidCheckCreator.create_valid_dcv_check_request(dcv_method)
+        self._mock_dns_resolve_call_getting_multiple_txt_records(dcv_request, mocker)
+        dcv_response = await self.dcv_checker.check_dcv(dcv_request)
+        if dcv_method == DcvValidationMethod.DNS_CHANGE:
+            expected_value_1 = dcv_request.dcv_check_parameters.challenge_value
+        else:
+            expected_value_1 = dcv_request.dcv_check_parameters.key_authorization_hash
+        assert dcv_response.check_passed is True
+        assert dcv_response.details.records_seen == [expected_value_1]
+
     @pytest.mark.parametrize(
         "dcv_method, response_code",
         [
@@ -1031,13 +1476,6 @@ class TestMpicDcvChecker:
             records_as_strings.append("1:0::0:1")
         assert MpicDcvChecker.is_expected_ip_address_in_response(expected_record, records_as_strings) is True
 
-    def raise_(self, ex):
-        # noinspection PyUnusedLocal
-        def _raise(*args, **kwargs):
-            raise ex
-
-        return _raise()
-
     @staticmethod
     def _create_base_client_response_for_mock(event_loop):
         return ClientResponse(
@@ -1054,7 +1492,7 @@ class TestMpicDcvChecker:
 
     @staticmethod
     def _create_mock_http_response(status_code: int, content: str, kwargs: dict = None):
-        event_loop = asyncio.get_event_loop()
+        event_loop = asyncio.get_running_loop()
         response = TestMpicDcvChecker._create_base_client_response_for_mock(event_loop)
         response.status = status_code
 
@@ -1078,7 +1516,7 @@ class TestMpicDcvChecker:
 
     @staticmethod
     def _create_mock_http_redirect_response(status_code: int, redirect_url: str):
-        event_loop = asyncio.get_event_loop()
+        event_loop = asyncio.get_running_loop()
         response = TestMpicDcvChecker._create_base_client_response_for_mock(event_loop)
         response.status = status_code
         # Set both the Location header and the URL property
@@ -1088,7 +1526,7 @@ class TestMpicDcvChecker:
 
     @staticmethod
     def _create_mock_http_response_with_content_and_encoding(content: bytes, encoding: str):
-        event_loop = asyncio.get_event_loop()
+        event_loop = asyncio.get_running_loop()
         response = TestMpicDcvChecker._create_base_client_response_for_mock(event_loop)
         response.status = 200
         response._headers = CIMultiDictProxy(CIMultiDict({"Content-Type": f"text/plain; charset={encoding}"}))
@@ -1114,10 +1552,8 @@ class TestMpicDcvChecker:
         # noinspection PyProtectedMember
         return mocker.patch(
             "aiohttp.ClientSession.get",
-            side_effect=lambda *args, **kwargs: AsyncMock(
-                __aenter__=AsyncMock(
-                    return_value=success_response if kwargs.get("url") == expected_url else not_found_response
-                )
+            side_effect=lambda *args, **kwargs: _MockHttpGetContextManager(
+                success_response if kwargs.get("url") == expected_url else not_found_response
             ),
         )
 
@@ -1126,15 +1562,13 @@ class TestMpicDcvChecker:
 
         return mocker.patch(
             "aiohttp.ClientSession.get",
-            side_effect=lambda *args, **kwargs: AsyncMock(
-                __aenter__=AsyncMock(return_value=next(responses_iter)), __aexit__=AsyncMock()
-            ),
+            side_effect=lambda *args, **kwargs: _MockHttpGetContextManager(next(responses_iter)),
         )
 
     def _mock_request_agnostic_http_response(self, mock_response: ClientResponse, mocker):
         return mocker.patch(
             "aiohttp.ClientSession.get",
-            side_effect=lambda *args, **kwargs: AsyncMock(__aenter__=AsyncMock(return_value=mock_response)),
+            return_value=_MockHttpGetContextManager(mock_response),
         )
 
     def _mock_error_http_response(self, mocker):
@@ -1145,7 +1579,7 @@ class TestMpicDcvChecker:
         # return mocker.patch("aiohttp.ClientSession.get", side_effect=side_effect)
         return mocker.patch(
             "aiohttp.ClientSession.get",
-            side_effect=lambda *args, **kwargs: AsyncMock(__aenter__=AsyncMock(side_effect=ClientConnectionError())),
+            return_value=_MockHttpGetContextManager(error=ClientConnectionError()),
         )
 
     def patch_resolver_resolve_with_side_effect(self, mocker, resolver, side_effect):
@@ -1183,7 +1617,7 @@ class TestMpicDcvChecker:
         async def side_effect(qname, rdtype):
             if qname == expected_domain:
                 return test_dns_query_answer
-            raise self.raise_(dns.resolver.NoAnswer)
+            raise dns.resolver.NoAnswer
 
         return self.patch_resolver_resolve_with_side_effect(mocker, self.dcv_checker.resolver, side_effect)
 
@@ -1220,14 +1654,13 @@ class TestMpicDcvChecker:
         else:
             record_data = {"value": check_parameters.key_authorization_hash}
             record_name_prefix = "_acme-challenge"
-        txt_record_1 = MockDnsObjectCreator.create_record_by_type(DnsRecordType.TXT, record_data)
-        txt_record_2 = MockDnsObjectCreator.create_record_by_type(DnsRecordType.TXT, {"value": "whatever2"})
-        txt_record_3 = MockDnsObjectCreator.create_record_by_type(DnsRecordType.TXT, {"value": "whatever3"})
+        matching_txt_record = MockDnsObjectCreator.create_record_by_type(DnsRecordType.TXT, record_data)
         test_dns_query_answer = MockDnsObjectCreator.create_dns_query_answer_with_multiple_records(
             dcv_request.domain_or_ip_target,
             record_name_prefix,
             DnsRecordType.TXT,
-            *[txt_record_1, txt_record_2, txt_record_3],
+            matching_txt_record,
+            *NON_MATCHING_TXT_RECORDS,
             mocker=mocker,
         )
         self._patch_resolver_with_answer_or_exception(mocker, test_dns_query_answer)
@@ -8,6 +8,7 @@ from open_mpic_core import (
     DcvValidationMethod,
     UrlScheme,
     MpicDcvRequest,
+    MPIC_REQUEST_ADAPTER,
 )
 
 from unit.test_util.valid_mpic_request_creator import ValidMpicRequestCreator
@@ -24,6 +25,12 @@ class TestMpicDcvRequest:
         mpic_request = MpicDcvRequest.model_validate_json(json.dumps(request.model_dump(warnings=False)))
         assert mpic_request.domain_or_ip_target == request.domain_or_ip_target
 
+    def mpic_request_adapter__should_return_dcv_mpic_request_given_valid_dcv_json(self):
+        request = ValidMpicRequestCreator.create_valid_dcv_mpic_request()
+        mpic_request = MPIC_REQUEST_ADAPTER.validate_json(json.dumps(request.model_dump(warnings=False)))
+        assert isinstance(mpic_request, MpicDcvRequest)
+        assert mpic_request == request
+
     def mpic_dcv_request__should_require_dcv_check_parameters(self):
         request = ValidMpicRequestCreator.create_valid_dcv_mpic_request()
         # noinspection PyTypeChecker
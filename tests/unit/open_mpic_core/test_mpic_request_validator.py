@@ -52,9 +52,9 @@ class TestMpicRequestValidator:
         is_request_valid, validation_issues = MpicRequestValidator.is_request_valid(request, self.known_perspectives)
         assert is_request_valid is False
         issue_type = MpicRequestValidationMessages.INVALID_PERSPECTIVE_COUNT.key
-        assert issue_type in [issue.issue_type for issue in validation_issues]
-        invalid_perspective_count_issue = next(issue for issue in validation_issues if issue.issue_type == issue_type)
-        assert str(perspective_count) in invalid_perspective_count_issue.message
+        issues_by_type = {issue.issue_type: issue for issue in validation_issues}
+        assert issue_type in issues_by_type
+        assert str(perspective_count) in issues_by_type[issue_type].message
 
     @pytest.mark.parametrize("quorum_count", [1, -1, 0, 10, "abc", sys.maxsize + 1])
     def is_request_valid__should_be_false_with_message_given_invalid_quorum_count(self, quorum_count):
@@ -63,9 +63,19 @@ class TestMpicRequestValidator:
         is_request_valid, validation_issues = MpicRequestValidator.is_request_valid(request, self.known_perspectives)
         assert is_request_valid is False
         issue_type = MpicRequestValidationMessages.INVALID_QUORUM_COUNT.key
-        assert issue_type in [issue.issue_type for issue in validation_issues]
-        invalid_quorum_count_issue = next(issue for issue in validation_issues if issue.issue_type == issue_type)
-        assert str(quorum_count) in invalid_quorum_count_issue.message
+        issues_by_type = {issue.issue_type: issue for issue in validation_issues}
+        assert issue_type in issues_by_type
+        assert str(quorum_count) in issues_by_type[issue_type].message
+
+    def validate_quorum_count__should_reject_bool_given_it_would_otherwise_pass_as_a_count(self):
+        request_validation_issues = []
+        MpicRequestValidator.validate_quorum_count(2, True, request_validation_issues)  # 2 perspectives: quorum 1 ok
+        assert len(request_validation_issues) == 1
+        assert request_validation_issues[0].issue_type == MpicRequestValidationMessages.INVALID_QUORUM_COUNT.key
+
+    def is_requested_cohort_for_single_attempt_valid__should_be_false_given_bool(self):
+        assert MpicRequestValidator.is_requested_cohort_for_single_attempt_valid(1, 2) is True
+        assert MpicRequestValidator.is_requested_cohort_for_single_attempt_valid(True, 2) is False
 
     # fmt: off
     @pytest.mark.parametrize("challenge_value, match_regex, expected_is_request_valid, error_message", [
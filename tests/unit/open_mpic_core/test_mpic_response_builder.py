@@ -7,6 +7,8 @@ from open_mpic_core import (
     DcvCheckResponseDetailsBuilder,
     CheckType,
     DcvValidationMethod,
+    MpicCaaRequest,
+    MpicCaaResponse,
     MpicResponseBuilder,
     PerspectiveResponse,
 )
@@ -98,6 +100,17 @@ class TestMpicResponseBuilder:
         )
         assert mpic_response.previous_attempt_results == previous_attempt_results
 
+    def build_response__should_build_caa_response_given_request_of_other_type(self):
+        class CustomCaaRequest(MpicCaaRequest):  # e.g. a wrapper's own request subclass
+            pass
+
+        caa_request = ValidMpicRequestCreator.create_valid_caa_mpic_request()
+        request = CustomCaaRequest.model_validate(caa_request.model_dump())
+        perspective_responses = self.create_perspective_responses_given_check_type(CheckType.CAA)
+        mpic_response = MpicResponseBuilder.build_response(request, 6, 4, 1, perspective_responses, True, None)
+        assert isinstance(mpic_response, MpicCaaResponse)
+        assert mpic_response.caa_check_parameters == request.caa_check_parameters
+
 
 if __name__ == "__main__":
     pytest.main()